@@ -3,7 +3,7 @@ Django settings for study_tracker project.
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -135,3 +135,88 @@ GOOGLE_OAUTH_SCOPES = [
 
 # Google Calendar Settings
 GOOGLE_CALENDAR_REDIRECT_URI = 'http://localhost:8000/google-calendar/callback/'
+
+# Notification scheduler settings
+# 'interval' polls for due reminders every minute, 'event' registers one exact-time job per session
+NOTIFICATION_SCHEDULER_MODE = config('NOTIFICATION_SCHEDULER_MODE', default='interval')
+# Event mode: seconds until the leader picks up sessions saved or deleted in other processes (web workers),
+# so a new or moved reminder is planned within this delay; changes made in the leader's process apply at once
+REMINDER_JOB_POLL_SECONDS = config('REMINDER_JOB_POLL_SECONDS', default=2, cast=float)
+
+# What to do with reminders missed while the scheduler was down or behind: 'deliver', 'collapse' or 'expire'
+MISSED_NOTIFICATION_POLICY = config('MISSED_NOTIFICATION_POLICY', default='deliver')
+# Reminders for sessions that started longer ago than this are always expired
+MISSED_NOTIFICATION_MAX_AGE_HOURS = config('MISSED_NOTIFICATION_MAX_AGE_HOURS', default=24, cast=int)
+
+# Start the scheduler automatically under `manage.py runserver`; elsewhere use `manage.py run_scheduler`
+SCHEDULER_AUTOSTART = config('SCHEDULER_AUTOSTART', default=True, cast=bool)
+
+# Seconds a scheduler lease stays valid without a heartbeat before another process takes over
+SCHEDULER_LEASE_SECONDS = config('SCHEDULER_LEASE_SECONDS', default=60, cast=int)
+
+# Number of user partitions (user_id % SCHEDULER_SHARDS) that run_scheduler processes split reminders into
+SCHEDULER_SHARDS = config('SCHEDULER_SHARDS', default=1, cast=int)
+
+# Built Calendar API clients cached per user; each thread adds its own http object (LRU size and lifetime in seconds)
+GOOGLE_CLIENT_CACHE_SIZE = config('GOOGLE_CLIENT_CACHE_SIZE', default=256, cast=int)
+GOOGLE_CLIENT_CACHE_TTL = config('GOOGLE_CLIENT_CACHE_TTL', default=3600, cast=int)
+
+# Google tokens are refreshed this many seconds before expiry; the scheduler refreshes them further ahead
+GOOGLE_TOKEN_REFRESH_MARGIN = config('GOOGLE_TOKEN_REFRESH_MARGIN', default=300, cast=int)
+GOOGLE_TOKEN_REFRESH_AHEAD = config('GOOGLE_TOKEN_REFRESH_AHEAD', default=900, cast=int)
+
+# Google Calendar side-effects run on a bounded worker pool outside the scheduler tick
+GOOGLE_SYNC_WORKERS = config('GOOGLE_SYNC_WORKERS', default=4, cast=int)
+GOOGLE_SYNC_QUEUE_SIZE = config('GOOGLE_SYNC_QUEUE_SIZE', default=100, cast=int)
+# Seconds the tick waits for a free slot before deferring a Google update to the sync outbox
+GOOGLE_SYNC_SUBMIT_TIMEOUT = config('GOOGLE_SYNC_SUBMIT_TIMEOUT', default=1, cast=float)
+
+# Addresses allowed to scrape /metrics/ without a staff login (empty: staff only).
+# Matched against REMOTE_ADDR, so never list a reverse proxy's address (e.g. 127.0.0.1
+# behind a same-host proxy): every request it forwards would get in
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=Csv())
+
+# Google Calendar outbox drained by `manage.py run_sync_worker`
+GOOGLE_SYNC_OUTBOX_BATCH_SIZE = config('GOOGLE_SYNC_OUTBOX_BATCH_SIZE', default=50, cast=int)
+# Failed entries are retried with exponential backoff and dead-lettered after MAX_ATTEMPTS
+GOOGLE_SYNC_OUTBOX_MAX_ATTEMPTS = config('GOOGLE_SYNC_OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+GOOGLE_SYNC_OUTBOX_RETRY_SECONDS = config('GOOGLE_SYNC_OUTBOX_RETRY_SECONDS', default=30, cast=int)
+GOOGLE_SYNC_OUTBOX_MAX_RETRY_SECONDS = config('GOOGLE_SYNC_OUTBOX_MAX_RETRY_SECONDS', default=3600, cast=int)
+# Entries stuck in 'processing' longer than this (crashed worker) are claimed again
+GOOGLE_SYNC_OUTBOX_LOCK_SECONDS = config('GOOGLE_SYNC_OUTBOX_LOCK_SECONDS', default=300, cast=int)
+# Finished entries are deleted by the sync worker once they are this many days old
+GOOGLE_SYNC_OUTBOX_RETENTION_DAYS = config('GOOGLE_SYNC_OUTBOX_RETENTION_DAYS', default=7, cast=int)
+
+# Google Calendar API rate limits (requests per second and burst size), global and per user
+GOOGLE_API_RATE = config('GOOGLE_API_RATE', default=50, cast=float)
+GOOGLE_API_BURST = config('GOOGLE_API_BURST', default=100, cast=int)
+GOOGLE_API_USER_RATE = config('GOOGLE_API_USER_RATE', default=10, cast=float)
+GOOGLE_API_USER_BURST = config('GOOGLE_API_USER_BURST', default=50, cast=int)
+# Longest a call waits for rate-limit capacity before failing
+GOOGLE_API_ACQUIRE_TIMEOUT = config('GOOGLE_API_ACQUIRE_TIMEOUT', default=60, cast=float)
+# Retries of rate-limited (and, for idempotent calls, failed) requests, with exponential backoff in seconds
+GOOGLE_API_MAX_RETRIES = config('GOOGLE_API_MAX_RETRIES', default=5, cast=int)
+GOOGLE_API_BACKOFF_BASE = config('GOOGLE_API_BACKOFF_BASE', default=1.0, cast=float)
+GOOGLE_API_BACKOFF_MAX = config('GOOGLE_API_BACKOFF_MAX', default=32.0, cast=float)
+
+# Base URL of the Google Calendar API, e.g. http://127.0.0.1:8765/ for `manage.py fake_calendar_server`
+# (empty uses Google's servers)
+GOOGLE_CALENDAR_API_ROOT = config('GOOGLE_CALENDAR_API_ROOT', default='')
+
+# Calendar v3 discovery document used to build API clients offline
+# (empty uses the copy bundled with google-api-python-client)
+GOOGLE_CALENDAR_DISCOVERY_DOCUMENT = config('GOOGLE_CALENDAR_DISCOVERY_DOCUMENT', default='')
+
+# Live notifications over Server-Sent Events (needs the ASGI server; under WSGI the page keeps polling)
+# Seconds between checks of the counters row; notifications written by other processes
+# (run_scheduler, other workers) reach a stream within this long
+NOTIFICATION_STREAM_POLL_SECONDS = config('NOTIFICATION_STREAM_POLL_SECONDS', default=5, cast=float)
+# Streams close after this long and the browser reconnects, waiting RETRY_MS first
+NOTIFICATION_STREAM_MAX_SECONDS = config('NOTIFICATION_STREAM_MAX_SECONDS', default=600, cast=int)
+NOTIFICATION_STREAM_RETRY_MS = config('NOTIFICATION_STREAM_RETRY_MS', default=3000, cast=int)
+# Most notifications sent at once after a reconnect
+NOTIFICATION_STREAM_MAX_BATCH = config('NOTIFICATION_STREAM_MAX_BATCH', default=5, cast=int)
+
+# Notifications returned by /api/notifications/ per page, by default and at most
+NOTIFICATIONS_PAGE_SIZE = config('NOTIFICATIONS_PAGE_SIZE', default=20, cast=int)
+NOTIFICATIONS_PAGE_SIZE_MAX = config('NOTIFICATIONS_PAGE_SIZE_MAX', default=100, cast=int)
@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import StudySession, GoogleCalendarIntegration, Notification
+from .models import StudySession, GoogleCalendarIntegration, GoogleSyncOutbox, Notification
 
 @admin.register(StudySession)
 class StudySessionAdmin(admin.ModelAdmin):
-    list_display = ('subject', 'user', 'study_date', 'start_time', 'end_time', 'status', 'sync_to_google')
+    list_display = ('subject', 'user', 'study_date', 'start_time', 'end_time', 'status', 'sync_to_google', 'google_sync_status')
     search_fields = ('subject', 'description')
-    list_filter = ('status', 'study_date', 'sync_to_google')
+    list_filter = ('status', 'study_date', 'sync_to_google', 'google_sync_status')
     ordering = ['-study_date', '-start_time']
 
 @admin.register(GoogleCalendarIntegration)
@@ -14,6 +14,12 @@ class GoogleCalendarIntegrationAdmin(admin.ModelAdmin):
     list_filter = ('sync_enabled', 'created_at')
     readonly_fields = ('google_access_token', 'google_refresh_token', 'google_token_expiry')
 
+@admin.register(GoogleSyncOutbox)
+class GoogleSyncOutboxAdmin(admin.ModelAdmin):
+    list_display = ('session_key', 'user', 'operation', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter = ('status', 'operation')
+    readonly_fields = ('last_error',)
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'notification_type', 'is_read', 'created_at')
@@ -1,5 +1,4 @@
 from django.apps import AppConfig
-import os
 
 
 class TrackerConfig(AppConfig):
@@ -7,10 +6,12 @@ class TrackerConfig(AppConfig):
     name = 'tracker'
     
     def ready(self):
-        # Only start scheduler in the main process (not during migrations, etc.)
-        if os.environ.get('RUN_MAIN') or not os.environ.get('RUN_MAIN'):
+        from . import signals  # noqa: F401  (connects the UserCounters receivers)
+        
+        # Only start scheduler in the runserver process (not in web workers, migrations, etc.)
+        from .scheduler import should_autostart_scheduler, start_scheduler
+        if should_autostart_scheduler():
             try:
-                from .scheduler import start_scheduler
                 start_scheduler()
                 print("Scheduler started successfully in apps.py")
             except Exception as e:
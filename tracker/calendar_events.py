@@ -0,0 +1,60 @@
+"""
+Google Calendar event bodies for study sessions.
+
+Every Calendar write (single create/update, batch sync, the scheduler's
+notification update and the pull path's fingerprinting) builds its payload
+here, so the same session always serializes to the same body and the
+per-field fingerprints used for change detection stay comparable.
+"""
+
+from datetime import datetime
+from django.utils import timezone
+
+
+class EventPayloadBuilder:
+    """Builds event bodies, resolving the timezone once for all sessions it serializes"""
+
+    def __init__(self, tz=None):
+        self.tz = tz or timezone.get_current_timezone()
+        self.tz_name = str(self.tz)
+
+    def _when(self, session_date, session_time):
+        # Same result as timezone.make_aware() for zoneinfo timezones, without the per-call checks
+        return {
+            'dateTime': datetime.combine(session_date, session_time, tzinfo=self.tz).isoformat(),
+            'timeZone': self.tz_name,
+        }
+
+    def build(self, session):
+        """Calendar event body for one study session"""
+        if session.notification_outcome == 'expired':
+            notification_status = "⌛ Notification expired unsent"
+        elif session.notification_outcome == 'skipped':
+            notification_status = "➖ No notification (session added after its reminder time)"
+        elif session.notification_sent:
+            notification_status = "✅ Notification sent"
+        else:
+            notification_status = "⏰ Notification pending"
+        return {
+            'summary': f'Study Session: {session.subject}',
+            'description': f'Subject: {session.subject}\n'
+                           f'Description: {session.description or "No description"}\n'
+                           f'Status: {session.status}\n'
+                           f'{notification_status}\n'
+                           f'Reminder: {session.reminder_minutes} minutes before session\n'
+                           f'Custom message: {session.notification_message or "Default notification"}\n'
+                           f'Synced via Study Tracker',
+            'start': self._when(session.study_date, session.start_time),
+            'end': self._when(session.study_date, session.end_time),
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'email', 'minutes': session.reminder_minutes},
+                    {'method': 'popup', 'minutes': session.reminder_minutes},
+                ],
+            },
+        }
+
+    def build_many(self, sessions):
+        """Event bodies for many sessions, keyed by session id"""
+        return {session.id: self.build(session) for session in sessions}
@@ -0,0 +1,52 @@
+"""
+Conditional GET for per-user read APIs.
+
+`conditional_on_data_version` derives an ETag from the user's
+UserCounters.data_version, which every write to their sessions or
+notifications bumps. A client revalidating with If-None-Match gets a 304
+after that single primary-key lookup, without the view running at all.
+
+No Last-Modified is sent: HTTP dates have one-second resolution, so a
+client revalidating with If-Modified-Since alone would be told a response
+is fresh after a write made later in the same second.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from .models import UserCounters
+
+
+def conditional_on_data_version(vary_seconds=None):
+    """Serve 304s for a user-scoped GET view until the user's data changes
+
+    The ETag covers the view, the full query string and the data version.
+    Views whose output also depends on the clock (e.g. "hours until") pass
+    vary_seconds so the ETag also changes at least that often.
+    Place it under @api_view/@permission_classes so it sees the authenticated
+    user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            counters = UserCounters.for_user(request.user.id)
+            key = f"{view.__name__}:{request.user.id}:{counters.data_version}:{request.get_full_path()}"
+            if vary_seconds:
+                key += f":{int(time.time() // vary_seconds)}"
+            etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                # Per-user data: browsers may keep it but must revalidate, shared caches must not store it
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
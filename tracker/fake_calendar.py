@@ -0,0 +1,277 @@
+"""
+Local stand-in for the Google Calendar API, for load tests and benchmarks.
+
+Implements the parts of Calendar v3 this project uses: events
+insert/get/update/patch/delete/list (with syncToken and paging) and the
+multipart batch endpoint. Latency, random server errors and quota
+rejections are configurable so the sync path can be measured under
+realistic conditions without touching Google.
+
+Point the app at it with GOOGLE_CALENDAR_API_ROOT=http://127.0.0.1:<port>/
+and run it with `manage.py fake_calendar_server`. Events are kept in
+memory per bearer token, so each user's calendar is separate.
+"""
+
+import email.parser
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = re.compile(r'^/calendar/v3/calendars/(?P<calendar>[^/]+)/events(?:/(?P<event>[^/]+))?$')
+BATCH_PATHS = ('/batch/calendar/v3', '/batch')
+
+STATUS_TEXT = {
+    200: 'OK', 204: 'No Content', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+    409: 'Conflict', 410: 'Gone', 429: 'Too Many Requests', 503: 'Service Unavailable',
+}
+
+
+def error_body(status, reason, message):
+    return {'error': {'code': status, 'message': message, 'errors': [{'reason': reason, 'message': message}]}}
+
+
+class FakeCalendarBackend:
+    """In-memory calendars plus the configured latency, error and quota behaviour"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, quota_per_second=None,
+                 user_quota_per_second=None, quota_status=403, retry_after=None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.quota_status = quota_status
+        self.retry_after = retry_after
+        self.quota = TokenBucket(quota_per_second, quota_per_second) if quota_per_second else None
+        self.user_quota_per_second = user_quota_per_second
+        self.user_quotas = {}
+        self.calendars = {}
+        self.seq = 0
+        self.stats = Counter()
+        self.lock = threading.Lock()
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def _take_quota(self, bucket):
+        if bucket.reserve() > 0:
+            bucket.release()
+            return False
+        return True
+
+    def check_quota(self, owner):
+        """Return an error response if this call is over quota, else None"""
+        if self.quota and not self._take_quota(self.quota):
+            reason = 'rateLimitExceeded'
+        elif self.user_quota_per_second:
+            with self.lock:
+                bucket = self.user_quotas.get(owner)
+                if bucket is None:
+                    bucket = TokenBucket(self.user_quota_per_second, self.user_quota_per_second)
+                    self.user_quotas[owner] = bucket
+            if self._take_quota(bucket):
+                return None
+            reason = 'userRateLimitExceeded'
+        else:
+            return None
+
+        headers = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+        status = self.quota_status
+        return status, headers, error_body(status, reason, 'Rate Limit Exceeded')
+
+    def handle(self, method, path, owner, body):
+        """Answer one Calendar call; returns (status, headers, json_body or None)"""
+        response = self._handle(method, path, owner, body)
+        self.stats[response[0]] += 1
+        return response
+
+    def _handle(self, method, path, owner, body):
+        url = urlsplit(path)
+        match = EVENTS_PATH.match(url.path)
+        if not match:
+            return 404, {}, error_body(404, 'notFound', f'Unknown path {url.path}')
+
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, {}, error_body(503, 'backendError', 'Backend Error')
+
+        rejection = self.check_quota(owner)
+        if rejection:
+            return rejection
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        calendar_key = (owner, unquote(match.group('calendar')))
+        event_id = unquote(match.group('event')) if match.group('event') else None
+
+        with self.lock:
+            events = self.calendars.setdefault(calendar_key, {})
+            if event_id is None:
+                if method == 'POST':
+                    return self._insert(events, body or {})
+                if method == 'GET':
+                    return self._list(events, params)
+            else:
+                event = events.get(event_id)
+                if event is None:
+                    return 404, {}, error_body(404, 'notFound', 'Not Found')
+                if method == 'GET':
+                    return 200, {}, event
+                if event['status'] == 'cancelled':
+                    return 410, {}, error_body(410, 'deleted', 'Resource has been deleted')
+                if method == 'PUT':
+                    return self._store(events, dict(body or {}, id=event_id))
+                if method == 'PATCH':
+                    return self._store(events, dict(event, **(body or {})))
+                if method == 'DELETE':
+                    self._store(events, dict(event, status='cancelled'))
+                    return 204, {}, None
+
+        return 400, {}, error_body(400, 'badRequest', f'Unsupported method {method}')
+
+    def _store(self, events, event):
+        self.seq += 1
+        event.setdefault('status', 'confirmed')
+        event['etag'] = f'"{self.seq}"'
+        event['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        event['htmlLink'] = f"https://calendar.example.invalid/event?eid={event['id']}"
+        event['_seq'] = self.seq
+        events[event['id']] = event
+        return 200, {}, {key: value for key, value in event.items() if key != '_seq'}
+
+    def _insert(self, events, body):
+        event_id = body.get('id') or uuid.uuid4().hex
+        if event_id in events:
+            return 409, {}, error_body(409, 'duplicate', 'The requested identifier already exists.')
+        return self._store(events, dict(body, id=event_id, status='confirmed'))
+
+    def _list(self, events, params):
+        since = 0
+        if params.get('syncToken'):
+            try:
+                since = int(params['syncToken'])
+            except ValueError:
+                return 410, {}, error_body(410, 'fullSyncRequired', 'Sync token is no longer valid')
+            if since > self.seq:
+                return 410, {}, error_body(410, 'fullSyncRequired', 'Sync token is no longer valid')
+
+        show_deleted = params.get('showDeleted') == 'true' or 'syncToken' in params
+        items = sorted(
+            (event for event in events.values()
+             if event['_seq'] > since and (show_deleted or event['status'] != 'cancelled')),
+            key=lambda event: event['_seq']
+        )
+        offset = int(params.get('pageToken') or 0)
+        page_size = min(int(params.get('maxResults') or 250), 2500)
+        page = items[offset:offset + page_size]
+
+        response = {
+            'kind': 'calendar#events',
+            'items': [{key: value for key, value in event.items() if key != '_seq'} for event in page],
+        }
+        if offset + page_size < len(items):
+            response['nextPageToken'] = str(offset + page_size)
+        else:
+            response['nextSyncToken'] = str(self.seq)
+        return 200, {}, response
+
+    def handle_batch(self, content_type, body, owner):
+        """Answer a multipart/mixed batch; returns (content_type, payload bytes)"""
+        message = email.parser.BytesParser().parsebytes(
+            b'Content-Type: ' + content_type.encode('utf-8') + b'\r\n\r\n' + body
+        )
+        boundary = f'batch_{uuid.uuid4().hex}'
+        parts = []
+
+        for part in message.get_payload() if message.is_multipart() else []:
+            content_id = part.get('Content-ID', '<>')[1:-1]
+            raw = part.get_payload(decode=False)
+            head, _, sub_body = raw.partition('\r\n\r\n') if '\r\n\r\n' in raw else raw.partition('\n\n')
+            method, sub_path = head.splitlines()[0].split(' ')[:2]
+            sub_json = json.loads(sub_body) if sub_body.strip() else None
+
+            status, headers, response_body = self.handle(method, sub_path, owner, sub_json)
+            lines = [f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "")}']
+            lines.extend(f'{name}: {value}' for name, value in headers.items())
+            payload = ''
+            if response_body is not None:
+                lines.append('Content-Type: application/json; charset=UTF-8')
+                payload = json.dumps(response_body)
+            parts.append(
+                f'--{boundary}\r\nContent-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n\r\n' + '\r\n'.join(lines) + '\r\n\r\n' + payload + '\r\n'
+            )
+
+        parts.append(f'--{boundary}--\r\n')
+        return f'multipart/mixed; boundary={boundary}', ''.join(parts).encode('utf-8')
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _owner(self):
+        return self.headers.get('Authorization', '').removeprefix('Bearer ').strip() or 'anonymous'
+
+    def _send(self, status, headers, payload, content_type='application/json; charset=UTF-8'):
+        self.send_response(status, STATUS_TEXT.get(status))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if payload:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        backend = self.server.backend
+        backend.delay()
+
+        if self.command == 'POST' and urlsplit(self.path).path in BATCH_PATHS:
+            content_type, payload = backend.handle_batch(self.headers.get('Content-Type', ''), raw, self._owner())
+            self._send(200, {}, payload, content_type)
+            return
+
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            self._send(400, {}, json.dumps(error_body(400, 'parseError', 'Parse Error')).encode('utf-8'))
+            return
+
+        status, headers, response_body = backend.handle(self.command, self.path, self._owner(), body)
+        payload = json.dumps(response_body).encode('utf-8') if response_body is not None else b''
+        self._send(status, headers, payload)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+
+class FakeCalendarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, backend):
+        super().__init__(address, FakeCalendarHandler)
+        self.backend = backend
+
+    @property
+    def root_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+
+def start_fake_calendar_server(port=0, addr='127.0.0.1', **options):
+    """Serve a FakeCalendarBackend from a daemon thread; returns the server"""
+    server = FakeCalendarServer((addr, port), FakeCalendarBackend(**options))
+    thread = threading.Thread(target=server.serve_forever, name='fake-calendar', daemon=True)
+    thread.start()
+    return server
@@ -1,17 +1,321 @@
 """
 Google Calendar integration service for Study Tracker
 """
+import hashlib
 import json
-from datetime import datetime, timedelta
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
-from google.auth.transport.requests import Request
+from google.auth.exceptions import RefreshError
 from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from .models import GoogleCalendarIntegration, StudySession
+from .models import GoogleCalendarIntegration, GoogleSyncOutbox, StudySession, UserCounters
+from .calendar_events import EventPayloadBuilder
+from .rate_limit import calendar_rate_limiter, is_rate_limit_error, backoff_delay, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of calls Google Calendar accepts in one batch request
+BATCH_LIMIT = 50
+
+# Session fields written back after a sync; saving only these keeps a
+# background sync from overwriting edits made meanwhile
+SYNC_STATE_FIELDS = ['google_event_id', 'google_event_fingerprint', 'last_synced', 'updated_at']
+
+
+def event_fingerprint(event):
+    """Hash each top-level field of an event body so changes can be detected per field"""
+    return {
+        field: hashlib.sha256(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        for field, value in event.items()
+    }
+
+
+def changed_event_fields(previous, current):
+    """Fields whose hash differs from the last pushed payload (all of them if unknown)"""
+    if not previous:
+        return list(current)
+    return [field for field, digest in current.items() if previous.get(field) != digest]
+
+
+class CalendarClientCache:
+    """Process-wide LRU cache of built Calendar API clients
+    
+    Building a client parses the discovery document, so one client per user
+    is shared by all threads; entries expire after a TTL and are rebuilt
+    whenever the user's access token changes. httplib2 connections are not
+    thread-safe, so each thread also gets its own authorized http object per
+    user, passed to every request it executes. Those live in thread-local
+    storage and go away with the thread.
+    """
+    
+    def __init__(self, max_size=256, ttl_seconds=3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()
+        self._local = threading.local()
+    
+    def get(self, user_id, credentials, factory):
+        """Return the cached client for this user, building it if needed
+        
+        Also prepares this thread's http object for the user (see thread_http).
+        """
+        now = time.monotonic()
+        self._prepare_http(user_id, credentials)
+        
+        with self._lock:
+            entry = self._clients.get(user_id)
+            if entry is not None:
+                client, token, created = entry
+                if token == credentials.token and now - created < self.ttl_seconds:
+                    self._clients.move_to_end(user_id)
+                    return client
+                del self._clients[user_id]
+        
+        client = factory(credentials)
+        
+        with self._lock:
+            self._clients[user_id] = (client, credentials.token, now)
+            self._clients.move_to_end(user_id)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+    
+    def _thread_entries(self):
+        entries = getattr(self._local, 'entries', None)
+        if entries is None:
+            entries = self._local.entries = OrderedDict()
+        return entries
+    
+    def _prepare_http(self, user_id, credentials):
+        entries = self._thread_entries()
+        entry = entries.get(user_id)
+        if entry is None or entry[0] is not credentials or entry[1] != credentials.token:
+            entries[user_id] = (credentials, credentials.token, build_authorized_http(credentials))
+        entries.move_to_end(user_id)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+    
+    def thread_http(self, user_id):
+        """This thread's http object for the user, or None if it has not fetched a client yet"""
+        entry = self._thread_entries().get(user_id)
+        return entry[2] if entry is not None else None
+    
+    def invalidate(self, user_id):
+        """Drop the cached client of a user (token refresh, reconnect or disconnect)
+        
+        Other threads' http objects are replaced the next time they fetch the
+        client with the new credentials.
+        """
+        with self._lock:
+            self._clients.pop(user_id, None)
+        self._thread_entries().pop(user_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+        self._thread_entries().clear()
+
+
+def to_google_expiry(expiry):
+    """Convert a stored token expiry to the naive UTC datetime google-auth expects"""
+    if expiry is None:
+        return None
+    if timezone.is_aware(expiry):
+        return timezone.make_naive(expiry, dt_timezone.utc)
+    return expiry
+
+
+def from_google_expiry(expiry):
+    """Convert google-auth's naive UTC expiry to an aware datetime for storage"""
+    if expiry is None:
+        return None
+    if timezone.is_naive(expiry):
+        return timezone.make_aware(expiry, dt_timezone.utc)
+    return expiry
+
+
+class CredentialCache:
+    """Per-user in-memory credentials with single-flight token refresh
+    
+    Credentials within ``refresh_margin_seconds`` of expiry count as stale,
+    so tokens are renewed before Google starts rejecting them. The cache is
+    per process: get_credentials() checks each hit against the integration
+    row, so a disconnect or refresh done by another process is seen on the
+    next use.
+    """
+    
+    def __init__(self, refresh_margin_seconds=300):
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        self._lock = threading.Lock()
+        self._credentials = {}
+        self._user_locks = {}
+    
+    def is_fresh(self, credentials, margin=None):
+        """Whether credentials can be used without refreshing first"""
+        if not credentials.token:
+            return False
+        if credentials.expiry is None:
+            return True  # Unknown expiry; the transport refreshes on a 401
+        return credentials.expiry - max(margin or self.refresh_margin, self.refresh_margin) > datetime.utcnow()
+    
+    def get_fresh(self, user_id, margin=None):
+        with self._lock:
+            credentials = self._credentials.get(user_id)
+        if credentials is not None and self.is_fresh(credentials, margin):
+            return credentials
+        return None
+    
+    def put(self, user_id, credentials):
+        with self._lock:
+            self._credentials[user_id] = credentials
+    
+    def lock_for(self, user_id):
+        """Lock that serializes loading and refreshing one user's credentials"""
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+    
+    def invalidate(self, user_id):
+        with self._lock:
+            self._credentials.pop(user_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._credentials.clear()
+
+
+client_cache = CalendarClientCache(
+    max_size=getattr(settings, 'GOOGLE_CLIENT_CACHE_SIZE', 256),
+    ttl_seconds=getattr(settings, 'GOOGLE_CLIENT_CACHE_TTL', 3600)
+)
+
+credential_cache = CredentialCache(
+    refresh_margin_seconds=getattr(settings, 'GOOGLE_TOKEN_REFRESH_MARGIN', 300)
+)
+
+
+def api_root():
+    """GOOGLE_CALENDAR_API_ROOT with a trailing slash"""
+    return settings.GOOGLE_CALENDAR_API_ROOT.rstrip('/') + '/'
+
+
+def api_root_options():
+    """Extra build() arguments pointing the client at GOOGLE_CALENDAR_API_ROOT"""
+    if not settings.GOOGLE_CALENDAR_API_ROOT:
+        return {}
+    return {'client_options': {'api_endpoint': f"{api_root()}calendar/v3/"}}
+
+
+_discovery_document = None
+
+
+def calendar_discovery_document():
+    """Calendar v3 discovery document, read from local disk once per process
+    
+    Defaults to the copy bundled with google-api-python-client (pinned in
+    requirements.txt); GOOGLE_CALENDAR_DISCOVERY_DOCUMENT can point at
+    another file. Kept as the raw JSON text because build_from_document()
+    modifies a parsed document in place.
+    """
+    global _discovery_document
+    if _discovery_document is None:
+        path = settings.GOOGLE_CALENDAR_DISCOVERY_DOCUMENT
+        if path:
+            with open(path, encoding='utf-8') as document_file:
+                _discovery_document = document_file.read()
+        else:
+            from googleapiclient.discovery_cache import get_static_doc
+            _discovery_document = get_static_doc('calendar', 'v3')
+    return _discovery_document
+
+
+def build_calendar_client(credentials):
+    """Build a Calendar API client offline from the local discovery document"""
+    from googleapiclient.discovery import build_from_document
+    
+    return build_from_document(calendar_discovery_document(), credentials=credentials, **api_root_options())
+
+
+def build_authorized_http(credentials):
+    """An http object of its own for one thread, signing requests with the credentials"""
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.http import build_http
+    
+    return AuthorizedHttp(credentials, http=build_http())
+
+
+def forget_user_credentials(user_id):
+    """Drop cached credentials and clients of a user (reconnect or disconnect)"""
+    credential_cache.invalidate(user_id)
+    client_cache.invalidate(user_id)
+
+
+def refresh_expiring_credentials(user_filter=None):
+    """Refresh soon-expiring tokens of users with Google work due, so request paths never wait on a refresh
+    
+    Only users with open sync outbox entries or a reminder due within the
+    refresh window (which updates their Calendar event) are refreshed; the
+    tokens of idle users are renewed on their next request instead.
+    ``user_filter`` can narrow the integrations queryset (e.g. to scheduler shards).
+    Returns the number of users whose credentials were checked.
+    """
+    from .sync_outbox import OPEN_STATUSES
+    
+    ahead = timedelta(seconds=getattr(settings, 'GOOGLE_TOKEN_REFRESH_AHEAD', 900))
+    now = timezone.now()
+    open_entries = GoogleSyncOutbox.objects.filter(user_id=OuterRef('user_id'), status__in=OPEN_STATUSES)
+    due_reminders = StudySession.objects.filter(
+        user_id=OuterRef('user_id'),
+        google_event_id__isnull=False,
+        notification_sent_at__isnull=True,
+        notification_outcome='',
+        notify_at__lte=now + ahead
+    )
+    integrations = GoogleCalendarIntegration.objects.filter(
+        sync_enabled=True,
+        google_refresh_token__isnull=False,
+        google_token_expiry__lt=now + ahead
+    ).filter(Exists(open_entries) | Exists(due_reminders)).select_related('user')
+    if user_filter is not None:
+        integrations = user_filter(integrations)
+    
+    service = GoogleCalendarService()
+    count = 0
+    for integration in integrations:
+        service.get_credentials(integration.user, refresh_margin=ahead)
+        count += 1
+    return count
+
+
+def disable_revoked_integration(user_id, error):
+    """Stop syncing a user whose refresh token Google rejected (revoked or expired grant)
+    
+    Retrying cannot succeed until the user reconnects, so sync is switched
+    off and the user is told to reconnect.
+    """
+    from .models import Notification
+    
+    if not GoogleCalendarIntegration.objects.filter(user_id=user_id, sync_enabled=True).update(sync_enabled=False):
+        return
+    forget_user_credentials(user_id)
+    logger.warning(f"Disabled Google Calendar sync for user {user_id}: {error}")
+    Notification.objects.get_or_create(
+        user_id=user_id,
+        study_session=None,
+        notification_type='system',
+        title="Google Calendar Disconnected",
+        defaults={
+            'message': "Google no longer accepts Study Tracker's access to your calendar. "
+                       "Reconnect Google Calendar in the settings to resume syncing.",
+        }
+    )
 
 
 class GoogleCalendarService:
@@ -25,6 +329,8 @@ class GoogleCalendarService:
     
     def get_authorization_url(self, state=None):
         """Generate Google OAuth authorization URL"""
+        from google_auth_oauthlib.flow import Flow
+        
         flow = Flow.from_client_config(
             {
                 "web": {
@@ -50,6 +356,8 @@ class GoogleCalendarService:
     
     def handle_oauth_callback(self, user, authorization_code, state=None):
         """Handle OAuth callback and save credentials"""
+        from google_auth_oauthlib.flow import Flow
+        
         try:
             flow = Flow.from_client_config(
                 {
@@ -76,7 +384,7 @@ class GoogleCalendarService:
                 defaults={
                     'google_access_token': credentials.token,
                     'google_refresh_token': credentials.refresh_token,
-                    'google_token_expiry': credentials.expiry,
+                    'google_token_expiry': from_google_expiry(credentials.expiry),
                     'sync_enabled': True
                 }
             )
@@ -84,48 +392,123 @@ class GoogleCalendarService:
             if not created:
                 integration.google_access_token = credentials.token
                 integration.google_refresh_token = credentials.refresh_token
-                integration.google_token_expiry = credentials.expiry
+                integration.google_token_expiry = from_google_expiry(credentials.expiry)
                 integration.sync_enabled = True
                 integration.save()
             
+            # Credentials and clients built with the previous tokens must not be reused
+            forget_user_credentials(user.id)
+            
             return True, "Google Calendar integrated successfully!"
             
         except Exception as e:
             return False, f"Error integrating Google Calendar: {str(e)}"
     
-    def get_credentials(self, user):
-        """Get valid credentials for a user"""
-        try:
-            integration = GoogleCalendarIntegration.objects.get(user=user)
-            
-            if not integration.google_access_token:
-                return None
-            
-            credentials = Credentials(
-                token=integration.google_access_token,
-                refresh_token=integration.google_refresh_token,
-                token_uri="https://oauth2.googleapis.com/token",
-                client_id=self.client_id,
-                client_secret=self.client_secret,
-                scopes=self.scopes
-            )
-            
-            # Refresh token if expired
-            if credentials.expired and credentials.refresh_token:
-                credentials.refresh(Request())
-                
-                # Update stored credentials
-                integration.google_access_token = credentials.token
-                integration.google_token_expiry = credentials.expiry
-                integration.save()
-            
-            return credentials
-            
-        except GoogleCalendarIntegration.DoesNotExist:
-            return None
-        except Exception as e:
-            print(f"Error getting credentials: {e}")
+    def _execute(self, user, request, idempotent=True, tokens=1):
+        """Execute a Calendar API request under the shared rate limiter
+        
+        Rate-limited requests are retried with backoff; server errors are
+        only retried when the request is idempotent.
+        """
+        return calendar_rate_limiter.execute(
+            user.id, request, idempotent=idempotent, tokens=tokens,
+            http=client_cache.thread_http(user.id)
+        )
+    
+    def get_calendar_client(self, user, credentials):
+        """Get a (cached) Calendar API client for the user"""
+        return client_cache.get(
+            user.id,
+            credentials,
+            build_calendar_client
+        )
+    
+    def new_batch(self, service, callback):
+        """Start a batch request, sent to GOOGLE_CALENDAR_API_ROOT when one is configured"""
+        if settings.GOOGLE_CALENDAR_API_ROOT:
+            from googleapiclient.http import BatchHttpRequest
+            
+            # The discovery document hard-codes the batch endpoint on googleapis.com
+            return BatchHttpRequest(callback=callback, batch_uri=f"{api_root()}batch/calendar/v3")
+        return service.new_batch_http_request(callback=callback)
+    
+    def get_credentials(self, user, refresh_margin=None):
+        """Get valid credentials for a user
+        
+        Every call first reads the integration row (one indexed lookup), so
+        a user disconnected or switched off elsewhere gets None. Tokens are
+        served from memory while they are not close to expiry and still match
+        the stored one. Otherwise the stored tokens are re-read (another process may already
+        have refreshed them) and, only if those are stale too, refreshed
+        once per user no matter how many threads are asking.
+        ``refresh_margin`` (a timedelta) widens how close to expiry counts as stale.
+        """
+        # The row is the source of truth: another process may have
+        # disconnected the user, turned sync off or refreshed the token
+        stored_token = GoogleCalendarIntegration.objects.filter(
+            user=user, sync_enabled=True
+        ).values_list('google_access_token', flat=True).first()
+        if not stored_token:
+            forget_user_credentials(user.id)
             return None
+        
+        credentials = credential_cache.get_fresh(user.id, refresh_margin)
+        if credentials and credentials.token == stored_token:
+            return credentials
+        
+        with credential_cache.lock_for(user.id):
+            # Another thread may have refreshed while we were waiting
+            credentials = credential_cache.get_fresh(user.id, refresh_margin)
+            if credentials and credentials.token == stored_token:
+                return credentials
+            
+            try:
+                integration = GoogleCalendarIntegration.objects.get(user=user, sync_enabled=True)
+                
+                if not integration.google_access_token:
+                    credential_cache.invalidate(user.id)
+                    return None
+                
+                credentials = Credentials(
+                    token=integration.google_access_token,
+                    refresh_token=integration.google_refresh_token,
+                    token_uri="https://oauth2.googleapis.com/token",
+                    client_id=self.client_id,
+                    client_secret=self.client_secret,
+                    scopes=self.scopes,
+                    expiry=to_google_expiry(integration.google_token_expiry)
+                )
+                
+                # Refresh token if expired or about to expire
+                if not credential_cache.is_fresh(credentials, refresh_margin) and credentials.refresh_token:
+                    from google.auth.transport.requests import Request
+                    credentials.refresh(Request())
+                    
+                    # Update stored credentials
+                    integration.google_access_token = credentials.token
+                    integration.google_token_expiry = from_google_expiry(credentials.expiry)
+                    integration.save(update_fields=['google_access_token', 'google_token_expiry', 'updated_at'])
+                    client_cache.invalidate(user.id)
+                
+                credential_cache.put(user.id, credentials)
+                return credentials
+                
+            except GoogleCalendarIntegration.DoesNotExist:
+                credential_cache.invalidate(user.id)
+                return None
+            except RefreshError as e:
+                if 'invalid_grant' in str(e):
+                    disable_revoked_integration(user.id, e)
+                else:
+                    logger.error(f"Error refreshing Google credentials for user {user.id}: {e}")
+                return None
+            except Exception as e:
+                logger.error(f"Error getting Google credentials for user {user.id}: {e}")
+                return None
+    
+    def build_session_event(self, study_session):
+        """Build the Calendar event body for a study session"""
+        return EventPayloadBuilder().build(study_session)
     
     def create_calendar_event(self, user, study_session):
         """Create a Google Calendar event for a study session"""
@@ -134,47 +517,19 @@ class GoogleCalendarService:
             return False, "No valid Google Calendar credentials"
         
         try:
-            service = build('calendar', 'v3', credentials=credentials)
-            
-            # Get local timezone
-            local_tz = timezone.get_current_timezone()
-            
-            # Combine date and time for start and end with proper timezone
-            start_datetime = datetime.combine(study_session.study_date, study_session.start_time)
-            end_datetime = datetime.combine(study_session.study_date, study_session.end_time)
-            
-            # Make timezone aware using Django's timezone utilities
-            start_datetime = timezone.make_aware(start_datetime, local_tz)
-            end_datetime = timezone.make_aware(end_datetime, local_tz)
-            
-            event = {
-                'summary': f'Study Session: {study_session.subject}',
-                'description': f'Subject: {study_session.subject}\n'
-                              f'Description: {study_session.description or "No description"}\n'
-                              f'Status: {study_session.status}\n'
-                              f'Notification: {study_session.reminder_minutes} minutes before\n'
-                              f'Created via Study Tracker',
-                'start': {
-                    'dateTime': start_datetime.isoformat(),
-                    'timeZone': str(local_tz),
-                },
-                'end': {
-                    'dateTime': end_datetime.isoformat(),
-                    'timeZone': str(local_tz),
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [],  # No reminders initially - will be added when notification is triggered
-                },
-            }
+            service = self.get_calendar_client(user, credentials)
+            event = self.build_session_event(study_session)
             
             # Create the event
-            created_event = service.events().insert(calendarId='primary', body=event).execute()
+            created_event = self._execute(
+                user, service.events().insert(calendarId='primary', body=event), idempotent=False
+            )
             
             # Update study session with Google event ID
             study_session.google_event_id = created_event['id']
-            study_session.last_synced = datetime.now()
-            study_session.save()
+            study_session.google_event_fingerprint = event_fingerprint(event)
+            study_session.last_synced = timezone.now()
+            study_session.save(update_fields=SYNC_STATE_FIELDS)
             
             return True, f"Event created: {created_event.get('htmlLink')}"
             
@@ -193,52 +548,33 @@ class GoogleCalendarService:
             return self.create_calendar_event(user, study_session)
         
         try:
-            service = build('calendar', 'v3', credentials=credentials)
-            
-            # Get local timezone
-            local_tz = timezone.get_current_timezone()
-            
-            # Combine date and time for start and end with proper timezone
-            start_datetime = datetime.combine(study_session.study_date, study_session.start_time)
-            end_datetime = datetime.combine(study_session.study_date, study_session.end_time)
-            
-            # Make timezone aware using Django's timezone utilities
-            start_datetime = timezone.make_aware(start_datetime, local_tz)
-            end_datetime = timezone.make_aware(end_datetime, local_tz)
-            
-            event = {
-                'summary': f'Study Session: {study_session.subject}',
-                'description': f'Subject: {study_session.subject}\n'
-                              f'Description: {study_session.description or "No description"}\n'
-                              f'Status: {study_session.status}\n'
-                              f'Updated via Study Tracker',
-                'start': {
-                    'dateTime': start_datetime.isoformat(),
-                    'timeZone': str(local_tz),
-                },
-                'end': {
-                    'dateTime': end_datetime.isoformat(),
-                    'timeZone': str(local_tz),
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 24 * 60},  # 1 day before
-                        {'method': 'popup', 'minutes': 30},        # 30 minutes before
-                    ],
-                },
-            }
-            
-            # Update the event
-            updated_event = service.events().update(
-                calendarId='primary', 
-                eventId=study_session.google_event_id, 
-                body=event
-            ).execute()
+            service = self.get_calendar_client(user, credentials)
+            event = self.build_session_event(study_session)
+            fingerprint = event_fingerprint(event)
+            changed_fields = changed_event_fields(study_session.google_event_fingerprint, fingerprint)
+            
+            if not changed_fields:
+                return True, "Event already up to date"
+            
+            if study_session.google_event_fingerprint:
+                # Only send the fields that differ from what was last pushed
+                updated_event = self._execute(user, service.events().patch(
+                    calendarId='primary',
+                    eventId=study_session.google_event_id,
+                    body={field: event[field] for field in changed_fields}
+                ))
+            else:
+                # Update the event
+                updated_event = self._execute(user, service.events().update(
+                    calendarId='primary', 
+                    eventId=study_session.google_event_id, 
+                    body=event
+                ))
             
             # Update last synced time
-            study_session.last_synced = datetime.now()
-            study_session.save()
+            study_session.google_event_fingerprint = fingerprint
+            study_session.last_synced = timezone.now()
+            study_session.save(update_fields=SYNC_STATE_FIELDS)
             
             return True, f"Event updated: {updated_event.get('htmlLink')}"
             
@@ -260,18 +596,19 @@ class GoogleCalendarService:
             return True, "No event to delete"
         
         try:
-            service = build('calendar', 'v3', credentials=credentials)
+            service = self.get_calendar_client(user, credentials)
             
             # Delete the event
-            service.events().delete(
+            self._execute(user, service.events().delete(
                 calendarId='primary', 
                 eventId=study_session.google_event_id
-            ).execute()
+            ))
             
             # Clear Google event ID
             study_session.google_event_id = None
+            study_session.google_event_fingerprint = None
             study_session.last_synced = None
-            study_session.save()
+            study_session.save(update_fields=SYNC_STATE_FIELDS)
             
             return True, "Event deleted from Google Calendar"
             
@@ -279,8 +616,27 @@ class GoogleCalendarService:
             if error.resp.status == 404:
                 # Event already doesn't exist
                 study_session.google_event_id = None
+                study_session.google_event_fingerprint = None
                 study_session.last_synced = None
-                study_session.save()
+                study_session.save(update_fields=SYNC_STATE_FIELDS)
+                return True, "Event was already deleted"
+            return False, f"Google Calendar API error: {error}"
+        except Exception as e:
+            return False, f"Error deleting calendar event: {str(e)}"
+    
+    def delete_event_by_id(self, user, event_id):
+        """Delete a Google Calendar event whose session no longer exists"""
+        credentials = self.get_credentials(user)
+        if not credentials:
+            return False, "No valid Google Calendar credentials"
+        
+        try:
+            service = self.get_calendar_client(user, credentials)
+            self._execute(user, service.events().delete(calendarId='primary', eventId=event_id))
+            return True, "Event deleted from Google Calendar"
+            
+        except HttpError as error:
+            if error.resp.status in (404, 410):
                 return True, "Event was already deleted"
             return False, f"Google Calendar API error: {error}"
         except Exception as e:
@@ -296,12 +652,295 @@ class GoogleCalendarService:
         
         # If sync is enabled
         if study_session.google_event_id:
+            # Skip the API entirely when nothing in the event payload changed
+            event = self.build_session_event(study_session)
+            if not changed_event_fields(study_session.google_event_fingerprint, event_fingerprint(event)):
+                return True, "Event already up to date"
+            
             # Update existing event
             return self.update_calendar_event(user, study_session)
         else:
             # Create new event
             return self.create_calendar_event(user, study_session)
     
+    def bulk_sync_sessions(self, user, sessions):
+        """Sync many sessions at once using Calendar batch requests
+        
+        Creates, updates and deletes are packed into batches of up to
+        BATCH_LIMIT calls, each sub-response is mapped back to its session
+        and the new event ids / sync times are written in one bulk update.
+        Sessions whose event payload is unchanged are skipped and changed
+        ones are patched with just the differing fields.
+        Returns (success_count, error_count, errors).
+        """
+        credentials = self.get_credentials(user)
+        if not credentials:
+            return 0, len(sessions), ["No valid Google Calendar credentials"]
+        
+        service = self.get_calendar_client(user, credentials)
+        events = service.events()
+        
+        success_count = 0
+        errors = []
+        changed = {}
+        operations = []
+        bodies = {}
+        # Serialize every synced session up front with one shared builder
+        payloads = EventPayloadBuilder().build_many(session for session in sessions if session.sync_to_google)
+        for session in sessions:
+            if session.sync_to_google:
+                body = payloads[session.id]
+                fingerprint = event_fingerprint(body)
+                if session.google_event_id:
+                    changed_fields = changed_event_fields(session.google_event_fingerprint, fingerprint)
+                    if not changed_fields:
+                        success_count += 1  # Already up to date, no API call
+                        continue
+                    if session.google_event_fingerprint:
+                        bodies[session.id] = ({field: body[field] for field in changed_fields}, fingerprint)
+                        operations.append((session, 'patch'))
+                    else:
+                        bodies[session.id] = (body, fingerprint)
+                        operations.append((session, 'update'))
+                else:
+                    bodies[session.id] = (body, fingerprint)
+                    operations.append((session, 'insert'))
+            elif session.google_event_id:
+                operations.append((session, 'delete'))
+            else:
+                success_count += 1  # Sync disabled, no action needed
+        
+        attempt = 0
+        while operations:
+            retries = []
+            rate_limited = False
+            retry_delay = 0
+            
+            for start in range(0, len(operations), BATCH_LIMIT):
+                chunk = {str(session.id): (session, operation)
+                         for session, operation in operations[start:start + BATCH_LIMIT]}
+                
+                def handle_response(request_id, response, exception, chunk=chunk):
+                    nonlocal success_count, rate_limited, retry_delay
+                    session, operation = chunk[request_id]
+                    status_code = exception.resp.status if isinstance(exception, HttpError) else None
+                    
+                    if exception is None or (operation == 'delete' and status_code in (404, 410)):
+                        if operation == 'insert':
+                            session.google_event_id = response['id']
+                        if operation == 'delete':
+                            session.google_event_id = None
+                            session.google_event_fingerprint = None
+                            session.last_synced = None
+                        else:
+                            session.google_event_fingerprint = bodies[session.id][1]
+                            session.last_synced = timezone.now()
+                        changed[session.id] = session
+                        success_count += 1
+                    elif operation in ('update', 'patch') and status_code == 404:
+                        # Event not found, create a new one in the next round
+                        retries.append((session, 'insert'))
+                    elif status_code and is_rate_limit_error(exception) and attempt < settings.GOOGLE_API_MAX_RETRIES:
+                        # Rejected before being applied, so safe to send again after backing off
+                        retries.append((session, operation))
+                        rate_limited = True
+                        retry_delay = max(retry_delay, retry_after_seconds(exception) or 0)
+                    else:
+                        errors.append(f"Session {session.id}: {exception}")
+                
+                batch = self.new_batch(service, handle_response)
+                for request_id, (session, operation) in chunk.items():
+                    if operation == 'insert':
+                        request = events.insert(calendarId='primary', body=payloads[session.id])
+                    elif operation == 'update':
+                        request = events.update(
+                            calendarId='primary',
+                            eventId=session.google_event_id,
+                            body=bodies[session.id][0]
+                        )
+                    elif operation == 'patch':
+                        request = events.patch(
+                            calendarId='primary',
+                            eventId=session.google_event_id,
+                            body=bodies[session.id][0]
+                        )
+                    else:
+                        request = events.delete(calendarId='primary', eventId=session.google_event_id)
+                    batch.add(request, request_id=request_id)
+                
+                try:
+                    self._execute(
+                        user, batch, tokens=len(chunk),
+                        idempotent=all(operation != 'insert' for _, operation in chunk.values())
+                    )
+                except Exception as e:
+                    errors.extend(f"Session {request_id}: {e}" for request_id in chunk)
+            
+            if rate_limited:
+                # Pause this user's bucket so the next round waits out the backoff
+                calendar_rate_limiter.backoff(user.id, max(retry_delay, backoff_delay(attempt)))
+                attempt += 1
+            operations = retries
+        
+        if changed:
+            StudySession.objects.bulk_update(
+                changed.values(), ['google_event_id', 'google_event_fingerprint', 'last_synced']
+            )
+            UserCounters.touch([user.id])
+        
+        return success_count, len(sessions) - success_count, errors
+    
+    def pull_calendar_changes(self, user):
+        """Pull changes made on the Google side since the last pull
+        
+        Uses the integration's stored syncToken so only changed events are
+        listed, maps them to sessions by google_event_id and applies them in
+        one bulk update. Falls back to a full listing when there is no token
+        yet or Google has invalidated it (410 Gone).
+        Returns (success, message).
+        """
+        integration = GoogleCalendarIntegration.objects.filter(user=user).first()
+        if integration is None:
+            return False, "Google Calendar is not connected"
+        if not integration.sync_enabled:
+            return False, "Google Calendar sync is turned off"
+        
+        credentials = self.get_credentials(user)
+        if not credentials:
+            return False, "No valid Google Calendar credentials"
+        
+        try:
+            events = self.get_calendar_client(user, credentials).events()
+            
+            try:
+                changes, next_sync_token = self._list_changed_events(user, events, integration.google_sync_token)
+            except HttpError as error:
+                if error.resp.status != 410 or not integration.google_sync_token:
+                    raise
+                # Sync token invalidated, fall back to a full resync
+                changes, next_sync_token = self._list_changed_events(user, events, None)
+            
+            updated_count, cancelled_count, skipped_count, pending_count = self._apply_calendar_changes(user, changes)
+            
+            integration.google_sync_token = next_sync_token
+            integration.last_pulled_at = timezone.now()
+            integration.save(update_fields=['google_sync_token', 'last_pulled_at', 'updated_at'])
+            
+            message = (f"Pulled {len(changes)} changed event(s): {updated_count} session(s) updated, "
+                       f"{cancelled_count} unlinked")
+            if skipped_count:
+                message += f", {skipped_count} skipped (a session must start and end on the same day)"
+            if pending_count:
+                message += f", {pending_count} kept (local changes are still being sent to Google)"
+            return True, message
+            
+        except HttpError as error:
+            return False, f"Google Calendar API error: {error}"
+        except Exception as e:
+            return False, f"Error pulling calendar changes: {str(e)}"
+    
+    def _list_changed_events(self, user, events, sync_token):
+        """List every event changed since sync_token (all events if None)"""
+        params = {'calendarId': 'primary', 'showDeleted': True, 'maxResults': 250}
+        if sync_token:
+            params['syncToken'] = sync_token
+        
+        changes = {}
+        page_token = None
+        while True:
+            response = self._execute(user, events.list(pageToken=page_token, **params))
+            for item in response.get('items', []):
+                changes[item['id']] = item
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return changes, response.get('nextSyncToken')
+    
+    def _apply_calendar_changes(self, user, changes):
+        """Write pulled event changes to the matching sessions in bulk
+        
+        Sessions with changes still queued in the sync outbox are left alone:
+        their local edit is newer than Google's copy and will overwrite it.
+        Events that match the last payload we pushed are echoes of our own
+        writes and are ignored too. Sessions have a single date, so events
+        moved to end on a later day (or not after they start) are left
+        unapplied rather than stored with a negative duration.
+        Returns (updated, cancelled, skipped, pending) counts.
+        """
+        from .sync_outbox import OPEN_STATUSES
+        
+        event_ids = list(changes)
+        sessions = []
+        for start in range(0, len(event_ids), 500):
+            sessions.extend(StudySession.objects.filter(
+                user=user,
+                google_event_id__in=event_ids[start:start + 500]
+            ))
+        
+        pending_ids = set()
+        session_ids = [session.id for session in sessions]
+        for start in range(0, len(session_ids), 500):
+            pending_ids.update(GoogleSyncOutbox.objects.filter(
+                session_key__in=session_ids[start:start + 500],
+                status__in=OPEN_STATUSES
+            ).values_list('session_key', flat=True))
+        
+        now = timezone.now()
+        builder = EventPayloadBuilder()
+        updated_count = cancelled_count = skipped_count = pending_count = 0
+        changed_sessions = []
+        for session in sessions:
+            item = changes[session.google_event_id]
+            
+            if session.id in pending_ids:
+                pending_count += 1
+                continue
+            
+            if item.get('status') == 'cancelled':
+                # Deleted in Google Calendar: stop syncing this session
+                session.google_event_id = None
+                session.google_event_fingerprint = None
+                session.sync_to_google = False
+                session.last_synced = None
+                cancelled_count += 1
+            else:
+                start_value = item.get('start', {}).get('dateTime')
+                end_value = item.get('end', {}).get('dateTime')
+                if start_value and end_value:
+                    start_datetime = timezone.localtime(datetime.fromisoformat(start_value))
+                    end_datetime = timezone.localtime(datetime.fromisoformat(end_value))
+                    if end_datetime.date() != start_datetime.date() or end_datetime <= start_datetime:
+                        skipped_count += 1
+                        continue
+                    session.study_date = start_datetime.date()
+                    session.start_time = start_datetime.time()
+                    session.end_time = end_datetime.time()
+                
+                summary = item.get('summary') or ''
+                if summary.startswith('Study Session: '):
+                    session.subject = summary[len('Study Session: '):][:100]
+                
+                session.update_derived_fields()
+                fingerprint = event_fingerprint(builder.build(session))
+                if fingerprint == session.google_event_fingerprint:
+                    continue  # Our own last push coming back, nothing changed remotely
+                
+                # Google now matches these values, so they need not be pushed back
+                session.google_event_fingerprint = fingerprint
+                session.last_synced = now
+                updated_count += 1
+            
+            session.updated_at = now
+            changed_sessions.append(session)
+        
+        if changed_sessions:
+            StudySession.objects.bulk_update(changed_sessions, [
+                'subject', 'study_date', 'start_time', 'end_time', 'duration', 'notify_at',
+                'google_event_id', 'google_event_fingerprint', 'sync_to_google', 'last_synced', 'updated_at'
+            ], batch_size=500)
+            UserCounters.touch([user.id])
+        
+        return updated_count, cancelled_count, skipped_count, pending_count
+    
     def create_generic_calendar_event(self, user, event_data):
         """Create a generic Google Calendar event with provided data"""
         credentials = self.get_credentials(user)
@@ -309,10 +948,12 @@ class GoogleCalendarService:
             return False, "No valid Google Calendar credentials", None
         
         try:
-            service = build('calendar', 'v3', credentials=credentials)
+            service = self.get_calendar_client(user, credentials)
             
             # Create the event
-            created_event = service.events().insert(calendarId='primary', body=event_data).execute()
+            created_event = self._execute(
+                user, service.events().insert(calendarId='primary', body=event_data), idempotent=False
+            )
             
             return True, f"Event created: {created_event.get('htmlLink')}", created_event['id']
             
@@ -330,64 +971,6 @@ class GoogleCalendarService:
         if not study_session.google_event_id:
             return False, "No Google Calendar event found for this session"
         
-        try:
-            service = build('calendar', 'v3', credentials=credentials)
-            
-            # Get local timezone
-            local_tz = timezone.get_current_timezone()
-            
-            # Combine date and time for start and end with proper timezone
-            start_datetime = datetime.combine(study_session.study_date, study_session.start_time)
-            end_datetime = datetime.combine(study_session.study_date, study_session.end_time)
-            
-            # Make timezone aware using Django's timezone utilities
-            start_datetime = timezone.make_aware(start_datetime, local_tz)
-            end_datetime = timezone.make_aware(end_datetime, local_tz)
-            
-            # Update the notification message in the description
-            notification_status = "✅ Notification sent" if study_session.notification_sent else "⏰ Notification pending"
-            notification_time = f"Reminder: {study_session.reminder_minutes} minutes before session"
-            
-            event = {
-                'summary': f'Study Session: {study_session.subject}',
-                'description': f'Subject: {study_session.subject}\n'
-                              f'Description: {study_session.description or "No description"}\n'
-                              f'Status: {study_session.status}\n'
-                              f'{notification_status}\n'
-                              f'{notification_time}\n'
-                              f'Custom message: {study_session.notification_message or "Default notification"}\n'
-                              f'Updated via Study Tracker',
-                'start': {
-                    'dateTime': start_datetime.isoformat(),
-                    'timeZone': str(local_tz),
-                },
-                'end': {
-                    'dateTime': end_datetime.isoformat(),
-                    'timeZone': str(local_tz),
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': study_session.reminder_minutes},  # Use the session's reminder time
-                        {'method': 'popup', 'minutes': study_session.reminder_minutes},   # Use the session's reminder time
-                    ],
-                },
-            }
-            
-            # Update the event
-            updated_event = service.events().update(
-                calendarId='primary', 
-                eventId=study_session.google_event_id, 
-                body=event
-            ).execute()
-            
-            # Update last synced time
-            study_session.last_synced = datetime.now()
-            study_session.save()
-            
-            return True, f"Event updated with notification info: {updated_event.get('htmlLink')}"
-            
-        except HttpError as error:
-            return False, f"Google Calendar API error: {error}"
-        except Exception as e:
-            return False, f"Error updating calendar event with notification: {str(e)}"
+        # The shared event body already carries the reminder and notification status,
+        # so this is a regular update that only sends what changed
+        return self.update_calendar_event(user, study_session)
@@ -0,0 +1,90 @@
+"""
+Leader election for the background scheduler.
+
+Every candidate process competes for a row in SchedulerLease. The holder
+renews it on each heartbeat; if it dies the lease lapses and another
+candidate takes over on its next heartbeat.
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+
+
+_identity = None
+_identity_pid = None
+
+
+def process_identity():
+    """Identity shared by every lease of this process (recomputed after a fork)"""
+    global _identity, _identity_pid
+    
+    if _identity_pid != os.getpid():
+        _identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        _identity_pid = os.getpid()
+    return _identity
+
+
+class LeaderLease:
+    """Acquire, renew and release a named lease stored in the database"""
+    
+    def __init__(self, name='scheduler', ttl_seconds=None):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds or getattr(settings, 'SCHEDULER_LEASE_SECONDS', 60))
+        self.identity = process_identity()
+        self.is_leader = False
+    
+    def try_acquire(self, takeover_grace=0, create=True):
+        """Take or renew the lease; return True while this process holds it
+        
+        A lapsed lease held by someone else is only taken over once it has
+        been expired for ``takeover_grace`` seconds. A missing lease row is
+        created and taken when ``create`` is set; otherwise it is created
+        already lapsed and unheld, so the grace period starts counting even
+        if the process meant to create it never starts.
+        """
+        from .models import SchedulerLease
+        
+        now = timezone.now()
+        lapsed_before = now - timedelta(seconds=takeover_grace)
+        
+        # A single conditional UPDATE decides the race between candidates
+        updated = SchedulerLease.objects.filter(name=self.name).filter(
+            Q(holder=self.identity) | Q(expires_at__isnull=True) | Q(expires_at__lt=lapsed_before)
+        ).update(holder=self.identity, expires_at=now + self.ttl, renewed_at=now)
+        
+        if not updated and not SchedulerLease.objects.filter(name=self.name).exists():
+            if create:
+                try:
+                    SchedulerLease.objects.create(
+                        name=self.name,
+                        holder=self.identity,
+                        expires_at=now + self.ttl,
+                        renewed_at=now
+                    )
+                    updated = 1
+                except IntegrityError:
+                    updated = 0  # Another candidate created it first
+            else:
+                SchedulerLease.objects.get_or_create(name=self.name, defaults={'expires_at': now})
+        
+        self.is_leader = bool(updated)
+        return self.is_leader
+    
+    def release(self):
+        """Give up the lease so another candidate can take over immediately"""
+        from .models import SchedulerLease
+        
+        SchedulerLease.objects.filter(name=self.name, holder=self.identity).update(
+            holder='', expires_at=None
+        )
+        self.is_leader = False
+    
+    @property
+    def heartbeat_seconds(self):
+        """How often the holder should renew so the lease never lapses while alive"""
+        return max(int(self.ttl.total_seconds() / 3), 1)
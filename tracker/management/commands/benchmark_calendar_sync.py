@@ -0,0 +1,178 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as dt_time, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from tracker.fake_calendar import start_fake_calendar_server
+from tracker.google_calendar_service import GoogleCalendarService, client_cache, credential_cache
+from tracker.models import GoogleCalendarIntegration, StudySession, UserCounters
+
+SCENARIOS = ('sync', 'bulk', 'notify')
+BENCH_USER_PREFIX = 'calendar-bench-'
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the Google Calendar sync path against a fake Calendar API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='sync_session calls, bulk syncs or scheduler notification updates '
+                                 '(repeat to run several; default all)')
+        parser.add_argument('--users', type=int, default=5, help='Benchmark users to create')
+        parser.add_argument('--sessions', type=int, default=50, help='Sessions per user')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads issuing calls')
+        parser.add_argument('--fake-server', action='store_true',
+                            help='Start a fake Calendar API in this process instead of using GOOGLE_CALENDAR_API_ROOT')
+        parser.add_argument('--latency-ms', type=float, default=20, help='Fake server base latency')
+        parser.add_argument('--jitter-ms', type=float, default=10, help='Fake server random extra latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fake server 503 rate')
+        parser.add_argument('--quota-per-second', type=float, help='Fake server global quota')
+        parser.add_argument('--user-quota-per-second', type=float, help='Fake server per-user quota')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the benchmark users and sessions')
+
+    def handle(self, *args, **options):
+        server = None
+        if options['fake_server']:
+            server = start_fake_calendar_server(
+                latency_ms=options['latency_ms'],
+                jitter_ms=options['jitter_ms'],
+                error_rate=options['error_rate'],
+                quota_per_second=options['quota_per_second'],
+                user_quota_per_second=options['user_quota_per_second'],
+            )
+            settings.GOOGLE_CALENDAR_API_ROOT = server.root_url
+        elif not settings.GOOGLE_CALENDAR_API_ROOT:
+            raise CommandError('Set GOOGLE_CALENDAR_API_ROOT to a fake Calendar API or pass --fake-server; '
+                               'refusing to load-test the real Google API')
+
+        self.stdout.write(f'Calendar API: {settings.GOOGLE_CALENDAR_API_ROOT}')
+        client_cache.clear()
+        credential_cache.clear()
+        self.service = GoogleCalendarService()
+        self.concurrency = options['concurrency']
+
+        users = self.create_fixtures(options['users'], options['sessions'])
+        try:
+            for scenario in options['scenario'] or SCENARIOS:
+                getattr(self, f'run_{scenario}')(users)
+        finally:
+            if not options['keep_data']:
+                User.objects.filter(username__startswith=BENCH_USER_PREFIX).delete()
+            if server:
+                stats = ', '.join(f'{status}: {count}' for status, count in sorted(server.backend.stats.items()))
+                self.stdout.write(f'Fake server responses by status: {stats}')
+                server.shutdown()
+
+    def create_fixtures(self, user_count, session_count):
+        """Create connected benchmark users, each with their own fake calendar"""
+        run_id = uuid.uuid4().hex[:8]
+        users = []
+        for index in range(user_count):
+            user, _ = User.objects.get_or_create(username=f'{BENCH_USER_PREFIX}{index}')
+            StudySession.objects.filter(user=user).delete()
+            GoogleCalendarIntegration.objects.update_or_create(user=user, defaults={
+                # A distinct token per run gives every user an empty calendar on the fake server
+                'google_access_token': f'bench-{run_id}-{index}',
+                'google_refresh_token': 'bench',
+                'google_token_expiry': timezone.now() + timedelta(days=1),
+                'sync_enabled': True,
+            })
+
+            sessions = []
+            for number in range(session_count):
+                session = StudySession(
+                    user=user,
+                    subject=f'Benchmark {number}',
+                    study_date=date.today() + timedelta(days=1 + number % 30),
+                    start_time=dt_time(8 + number % 10),
+                    end_time=dt_time(9 + number % 10),
+                    sync_to_google=True,
+                )
+                session.update_derived_fields()
+                sessions.append(session)
+            StudySession.objects.bulk_create(sessions)
+            # bulk_create skips the signals that keep counters current
+            UserCounters.rebuild(user.id)
+            users.append(user)
+
+        self.stdout.write(f'Created {user_count} users with {session_count} sessions each')
+        return users
+
+    def sessions_for(self, users):
+        return list(StudySession.objects.filter(user__in=users).select_related('user'))
+
+    def measure(self, label, calls, unit_count=None):
+        """Run the calls on the thread pool and report throughput and latency percentiles"""
+        def timed(call):
+            started = time.perf_counter()
+            try:
+                success = call()[0]
+            except Exception:
+                success = False
+            finally:
+                close_old_connections()
+            return success, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(timed, calls))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for _, latency in results)
+        ok = sum(1 for success, _ in results if success)
+        units = unit_count if unit_count is not None else len(results)
+        self.stdout.write(
+            f'{label:<22} calls={len(results):<6} ok={ok:<6} failed={len(results) - ok:<5} '
+            f'time={elapsed:6.2f}s  {units / elapsed if elapsed else 0:8.1f} sessions/s  '
+            f'p50={percentile(latencies, 50):7.1f}ms  p90={percentile(latencies, 90):7.1f}ms  '
+            f'p99={percentile(latencies, 99):7.1f}ms  max={latencies[-1] if latencies else 0:7.1f}ms'
+        )
+
+    def run_sync(self, users):
+        sessions = self.sessions_for(users)
+        label = 'sync_session (insert)' if not any(s.google_event_id for s in sessions) else 'sync_session'
+        self.measure(label, [lambda s=s: self.service.sync_session(s.user, s) for s in sessions])
+
+        # Change every session so the second pass patches existing events
+        for session in sessions:
+            session.subject = f'{session.subject} (edited)'
+        self.measure('sync_session (patch)', [lambda s=s: self.service.sync_session(s.user, s) for s in sessions])
+
+    def run_bulk(self, users):
+        by_user = {user.id: [] for user in users}
+        for session in self.sessions_for(users):
+            session.subject = f'{session.subject} (bulk)'
+            by_user[session.user_id].append(session)
+
+        def bulk_call(user, sessions):
+            success_count, error_count, errors = self.service.bulk_sync_sessions(user, sessions)
+            return error_count == 0, success_count
+
+        total = sum(len(sessions) for sessions in by_user.values())
+        self.measure('bulk_sync_sessions', [
+            lambda user=user: bulk_call(user, by_user[user.id]) for user in users
+        ], unit_count=total)
+
+    def run_notify(self, users):
+        missing = [user for user in users
+                   if StudySession.objects.filter(user=user, google_event_id__isnull=True).exists()]
+        for user in missing:
+            # Notification updates need existing events; create them untimed
+            self.service.bulk_sync_sessions(user, list(StudySession.objects.filter(user=user)))
+
+        sessions = self.sessions_for(users)
+        self.measure('notification update', [
+            lambda s=s: self.service.update_calendar_event_with_notification(s.user, s) for s in sessions
+        ])
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from tracker.fake_calendar import start_fake_calendar_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake Google Calendar API for load tests (set GOOGLE_CALENDAR_API_ROOT to its URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+        parser.add_argument('--addr', type=str, default='127.0.0.1', help='Address to bind to')
+        parser.add_argument('--latency-ms', type=float, default=0, help='Base latency added to every HTTP request')
+        parser.add_argument('--jitter-ms', type=float, default=0, help='Random extra latency, up to this much')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with 503')
+        parser.add_argument('--quota-per-second', type=float, help='Calls per second allowed across all users')
+        parser.add_argument('--user-quota-per-second', type=float, help='Calls per second allowed per user')
+        parser.add_argument('--quota-status', type=int, choices=[403, 429], default=403,
+                            help='Status returned for calls over quota')
+        parser.add_argument('--retry-after', type=int, help='Retry-After seconds sent with quota errors')
+
+    def handle(self, *args, **options):
+        server = start_fake_calendar_server(
+            port=options['port'],
+            addr=options['addr'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            quota_per_second=options['quota_per_second'],
+            user_quota_per_second=options['user_quota_per_second'],
+            quota_status=options['quota_status'],
+            retry_after=options['retry_after'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fake Google Calendar API listening on {server.root_url}'))
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            stats = ', '.join(f'{status}: {count}' for status, count in sorted(server.backend.stats.items()))
+            self.stdout.write(f'Responses by status: {stats or "none"}')
@@ -0,0 +1,146 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from tracker.google_calendar_service import GoogleCalendarService, client_cache, credential_cache
+from tracker.models import GoogleCalendarIntegration, StudySession
+
+
+class Checkpoint:
+    """IDs of users already resynced, persisted after every user so a rerun can resume"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = set()
+        if os.path.exists(path):
+            with open(path) as checkpoint_file:
+                self.completed = set(json.load(checkpoint_file).get('completed_users', []))
+
+    def mark_done(self, user_id):
+        with self.lock:
+            self.completed.add(user_id)
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w') as checkpoint_file:
+                json.dump({'completed_users': sorted(self.completed)}, checkpoint_file)
+            # Atomic swap so an interrupted run never leaves a half-written checkpoint
+            os.replace(temp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Command(BaseCommand):
+    help = 'Resync every user with Google Calendar sync enabled, fanned out over a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Users resynced in parallel')
+        parser.add_argument('--checkpoint', type=str,
+                            default=os.path.join(tempfile.gettempdir(), 'google_resync_checkpoint.json'),
+                            help='File recording completed users, used to resume an interrupted run '
+                                 '(defaults to the system temp directory)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint and resync everyone')
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only resync this user ID (repeatable)')
+        parser.add_argument('--force', action='store_true',
+                            help='Push every event even if it looks unchanged (e.g. after events were lost)')
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options['checkpoint'])
+        if options['restart']:
+            checkpoint.remove()
+            checkpoint.completed = set()
+
+        integrations = GoogleCalendarIntegration.objects.filter(sync_enabled=True).select_related('user')
+        if options['user_ids']:
+            integrations = integrations.filter(user_id__in=options['user_ids'])
+        users = [integration.user for integration in integrations.order_by('user_id')
+                 if integration.user_id not in checkpoint.completed]
+
+        if checkpoint.completed:
+            self.stdout.write(f'Resuming: {len(checkpoint.completed)} users already done')
+        if not users:
+            self.stdout.write(self.style.SUCCESS('Nothing to resync'))
+            return
+
+        # Credentials may have been rotated; drop anything cached in this process
+        credential_cache.clear()
+        client_cache.clear()
+
+        self.force = options['force']
+        self.output_lock = threading.Lock()
+        self.started = time.monotonic()
+        self.done_users = 0
+        self.total_users = len(users)
+        failed_users = []
+        totals = {'synced': 0, 'failed': 0}
+
+        self.stdout.write(f'Resyncing {len(users)} users with {options["workers"]} workers')
+
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='google-resync') as executor:
+            futures = {executor.submit(self.resync_user, user): user for user in users}
+            for future in as_completed(futures):
+                user = futures[future]
+                try:
+                    synced, errors = future.result()
+                except Exception as e:
+                    synced, errors = 0, [str(e)]
+
+                totals['synced'] += synced
+                totals['failed'] += len(errors)
+                if errors:
+                    failed_users.append(user)
+                else:
+                    checkpoint.mark_done(user.id)
+                self.report_progress(user, synced, errors)
+
+        elapsed = time.monotonic() - self.started
+        summary = (f'Resynced {totals["synced"]} sessions for {len(users) - len(failed_users)} users '
+                   f'in {elapsed:.1f}s, {totals["failed"]} sessions failed')
+        if failed_users:
+            self.stdout.write(self.style.WARNING(
+                f'{summary}. Rerun to retry users: {", ".join(str(user.id) for user in failed_users)}'
+            ))
+        else:
+            checkpoint.remove()
+            self.stdout.write(self.style.SUCCESS(summary))
+
+    def resync_user(self, user):
+        """Sync one user's sessions in order; returns (synced_count, errors)"""
+        service = GoogleCalendarService()
+        synced = 0
+        errors = []
+        try:
+            sessions = StudySession.objects.filter(
+                Q(sync_to_google=True) | Q(google_event_id__isnull=False),
+                user=user
+            ).order_by('id')
+            for session in sessions.iterator():
+                if self.force:
+                    session.google_event_fingerprint = None
+                success, message = service.sync_session(user, session)
+                if success:
+                    synced += 1
+                else:
+                    errors.append(f'Session {session.id}: {message}')
+        finally:
+            close_old_connections()
+        return synced, errors
+
+    def report_progress(self, user, synced, errors):
+        with self.output_lock:
+            self.done_users += 1
+            elapsed = time.monotonic() - self.started
+            rate = self.done_users / elapsed if elapsed else 0
+            line = (f'[{self.done_users}/{self.total_users}] {user.username}: '
+                    f'{synced} synced, {len(errors)} failed ({rate:.1f} users/s)')
+            self.stdout.write(self.style.ERROR(line) if errors else line)
+            for error in errors[:3]:
+                self.stdout.write(f'    {error}')
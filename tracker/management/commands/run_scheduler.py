@@ -0,0 +1,53 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tracker.metrics import start_metrics_server
+from tracker.scheduler import start_scheduler, shutdown_scheduler, get_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Run the notification scheduler as a dedicated process (one leader is elected across processes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shard-index',
+            type=int,
+            help='Shard of users this process owns when SCHEDULER_SHARDS > 1'
+        )
+        parser.add_argument(
+            '--metrics-port',
+            type=int,
+            help='Serve scheduler metrics for scraping on this port'
+        )
+        parser.add_argument(
+            '--metrics-addr',
+            type=str,
+            default='127.0.0.1',
+            help='Address the metrics server binds to'
+        )
+
+    def handle(self, *args, **options):
+        if options['metrics_port']:
+            start_metrics_server(options['metrics_port'], options['metrics_addr'])
+            self.stdout.write(f"Serving metrics on {options['metrics_addr']}:{options['metrics_port']}")
+        
+        shard_index = options['shard_index']
+        if shard_index is not None and not 0 <= shard_index < settings.SCHEDULER_SHARDS:
+            raise CommandError(f'--shard-index must be between 0 and {settings.SCHEDULER_SHARDS - 1}')
+        
+        start_scheduler(shard_index=shard_index)
+        
+        if get_scheduler() is None:
+            self.stderr.write(self.style.ERROR('Scheduler failed to start'))
+            return
+        
+        self.stdout.write(self.style.SUCCESS('Scheduler running, press Ctrl+C to stop'))
+        
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shutdown_scheduler()
+            self.stdout.write('Scheduler stopped')
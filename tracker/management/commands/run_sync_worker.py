@@ -0,0 +1,64 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from tracker.sync_outbox import process_outbox_batch, prune_done_entries, retry_failed_entries
+
+# Seconds between removals of old finished entries
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Drain the Google Calendar sync outbox (run one or more of these alongside the web server)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait when the outbox is empty'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Entries claimed per batch (defaults to GOOGLE_SYNC_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the ready entries once and exit'
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Re-queue dead-lettered entries before starting'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = retry_failed_entries()
+            self.stdout.write(f'Re-queued {count} failed entries')
+
+        self.stdout.write(self.style.SUCCESS('Sync worker running, press Ctrl+C to stop'))
+
+        last_pruned = None
+        try:
+            while True:
+                close_old_connections()
+                if last_pruned is None or time.monotonic() - last_pruned >= PRUNE_INTERVAL:
+                    pruned_count = prune_done_entries()
+                    last_pruned = time.monotonic()
+                    if pruned_count:
+                        self.stdout.write(f'Removed {pruned_count} old finished entries')
+
+                done_count, failed_count = process_outbox_batch(options['batch_size'])
+
+                if done_count or failed_count:
+                    self.stdout.write(f'Synced {done_count} entries, {failed_count} failed')
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write('Sync worker stopped')
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:39
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_notify_at(apps, schema_editor):
+    StudySession = apps.get_model('tracker', 'StudySession')
+    sessions = list(StudySession.objects.only('id', 'study_date', 'start_time', 'reminder_minutes'))
+    for session in sessions:
+        session_datetime = timezone.make_aware(datetime.combine(session.study_date, session.start_time))
+        session.notify_at = session_datetime - timedelta(minutes=session.reminder_minutes)
+    StudySession.objects.bulk_update(sessions, ['notify_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0005_studysession_google_notification_event_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='notify_at',
+            field=models.DateTimeField(blank=True, help_text='When the reminder for this session is due', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(condition=models.Q(('notification_enabled', True), ('notification_sent', False), ('status', 'Planned')), fields=['notify_at'], name='tracker_session_due_idx'),
+        ),
+        migrations.RunPython(populate_notify_at, migrations.RunPython.noop),
+    ]
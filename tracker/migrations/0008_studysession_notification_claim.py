@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_schedulerlease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='notification_claim',
+            field=models.CharField(blank=True, help_text='Token of the scheduler batch that claimed this reminder', max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0008_studysession_notification_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='google_event_fingerprint',
+            field=models.JSONField(blank=True, help_text='Per-field hashes of the event payload last pushed to Google Calendar', null=True),
+        ),
+    ]
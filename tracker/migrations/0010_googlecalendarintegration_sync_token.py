@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0009_studysession_google_event_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlecalendarintegration',
+            name='google_sync_token',
+            field=models.TextField(blank=True, help_text='Calendar syncToken from the last incremental pull', null=True),
+        ),
+        migrations.AddField(
+            model_name='googlecalendarintegration',
+            name='last_pulled_at',
+            field=models.DateTimeField(blank=True, help_text='Last time changes were pulled from Google Calendar', null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0010_googlecalendarintegration_sync_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='google_sync_status',
+            field=models.CharField(blank=True, choices=[('', 'Not synced'), ('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='', help_text='State of the queued Google Calendar sync for this session', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='GoogleSyncOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.BigIntegerField(help_text='ID of the session this change belongs to')),
+                ('operation', models.CharField(choices=[('sync', 'Sync'), ('delete', 'Delete')], default='sync', max_length=10)),
+                ('google_event_id', models.CharField(blank=True, help_text='Event to remove for delete operations', max_length=255, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time the next attempt may run')),
+                ('locked_by', models.CharField(blank=True, help_text='Worker currently processing this entry', max_length=255, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('study_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='tracker.studysession')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='tracker_outbox_ready_idx'), models.Index(fields=['session_key', 'status'], name='tracker_outbox_session_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_user_counters(apps, schema_editor):
+    StudySession = apps.get_model('tracker', 'StudySession')
+    UserCounters = apps.get_model('tracker', 'UserCounters')
+    rows = StudySession.objects.values('user_id').annotate(
+        total_sessions=Count('id'),
+        planned_sessions=Count('id', filter=Q(status='Planned')),
+        completed_sessions=Count('id', filter=Q(status='Completed')),
+        missed_sessions=Count('id', filter=Q(status='Missed')),
+    ).order_by()
+    UserCounters.objects.bulk_create([UserCounters(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tracker', '0011_googlesyncoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_sessions', models.IntegerField(default=0)),
+                ('planned_sessions', models.IntegerField(default=0)),
+                ('completed_sessions', models.IntegerField(default=0)),
+                ('missed_sessions', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_user_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:02
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_notification_counters(apps, schema_editor):
+    Notification = apps.get_model('tracker', 'Notification')
+    UserCounters = apps.get_model('tracker', 'UserCounters')
+    rows = Notification.objects.values('user_id').annotate(
+        total_notifications=Count('id'),
+        unread_notifications=Count('id', filter=Q(is_read=False)),
+        reminder_notifications=Count('id', filter=Q(notification_type='reminder')),
+        achievement_notifications=Count('id', filter=Q(notification_type='achievement')),
+        system_notifications=Count('id', filter=Q(notification_type='system')),
+    ).order_by()
+    for row in rows:
+        # Users without sessions have no counters row yet
+        UserCounters.objects.update_or_create(user_id=row.pop('user_id'), defaults=row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0012_usercounters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='achievement_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usercounters',
+            name='reminder_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usercounters',
+            name='system_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usercounters',
+            name='total_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usercounters',
+            name='unread_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_notification_counters, migrations.RunPython.noop),
+    ]
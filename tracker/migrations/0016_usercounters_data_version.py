@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0015_session_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+
+def mark_handled_reminders_sent(apps, schema_editor):
+    StudySession = apps.get_model('tracker', 'StudySession')
+    # How older reminders were handled was not recorded; sent is the common case
+    StudySession.objects.filter(notification_sent=True).update(notification_outcome='sent')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0017_reminderjobchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='notification_outcome',
+            field=models.CharField(blank=True, choices=[('', 'Pending'), ('sent', 'Sent'), ('late', 'Sent late'), ('collapsed', 'Sent in a summary'), ('expired', 'Expired unsent')], default='', help_text='How the reminder was handled', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='studysession',
+            name='notification_sent',
+            field=models.BooleanField(default=False, help_text='Whether the reminder has been handled (see notification_outcome)'),
+        ),
+        migrations.AlterField(
+            model_name='studysession',
+            name='notification_sent_at',
+            field=models.DateTimeField(blank=True, help_text='When notification was sent (empty if it expired unsent)', null=True),
+        ),
+        migrations.RunPython(mark_handled_reminders_sent, migrations.RunPython.noop),
+    ]
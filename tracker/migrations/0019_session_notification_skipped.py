@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0018_session_notification_outcome'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studysession',
+            name='notification_outcome',
+            field=models.CharField(blank=True, choices=[('', 'Pending'), ('sent', 'Sent'), ('late', 'Sent late'), ('collapsed', 'Sent in a summary'), ('expired', 'Expired unsent'), ('skipped', 'Skipped (created after its reminder time)')], default='', help_text='How the reminder was handled', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='studysession',
+            name='notification_sent_at',
+            field=models.DateTimeField(blank=True, help_text='When notification was sent (empty if nothing was sent)', null=True),
+        ),
+    ]
@@ -1,9 +1,17 @@
 from django.db import models
+from django.db.models import Count, F, Q
 from django import forms
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.contrib.auth.models import User
+from django.utils import timezone
 import json
 
+# Fields that notify_at is derived from
+NOTIFY_AT_SOURCE_FIELDS = {'study_date', 'start_time', 'reminder_minutes'}
+
+# How early a reminder may be sent before its exact notify time
+NOTIFICATION_WINDOW = timedelta(minutes=2)
+
 class GoogleCalendarIntegration(models.Model):
     """Model to store Google Calendar integration data for users"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -12,6 +20,11 @@ class GoogleCalendarIntegration(models.Model):
     google_token_expiry = models.DateTimeField(blank=True, null=True)
     google_calendar_id = models.CharField(max_length=255, blank=True, null=True)
     sync_enabled = models.BooleanField(default=False)
+    # Incremental pull state
+    google_sync_token = models.TextField(blank=True, null=True,
+                                         help_text="Calendar syncToken from the last incremental pull")
+    last_pulled_at = models.DateTimeField(blank=True, null=True,
+                                          help_text="Last time changes were pulled from Google Calendar")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -32,6 +45,33 @@ class GoogleCalendarIntegration(models.Model):
             'scopes': ['https://www.googleapis.com/auth/calendar']
         }
 
+class SchedulerLease(models.Model):
+    """Database-row lease that elects the one process allowed to run the scheduler"""
+    name = models.CharField(max_length=100, unique=True)
+    holder = models.CharField(max_length=255, blank=True, default='',
+                              help_text="Identity of the process holding the lease")
+    expires_at = models.DateTimeField(blank=True, null=True,
+                                      help_text="When the lease lapses unless it is renewed")
+    renewed_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.name} held by {self.holder or 'nobody'}"
+
+class ReminderJobChange(models.Model):
+    """A session whose exact-time reminder job the scheduler leader must re-plan (event mode)
+    
+    Written in the same transaction as the session change, by whichever
+    process made it, and consumed by the leader's
+    apply_reminder_job_changes job. Plain integer columns rather than foreign
+    keys: the rows must outlive deleted sessions and users.
+    """
+    user_id = models.IntegerField()
+    session_key = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Re-plan reminder of session {self.session_key}"
+
 class StudySession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     subject = models.CharField(max_length=100)
@@ -50,7 +90,7 @@ class StudySession(models.Model):
         default='Planned'
     )
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     # Google Calendar integration fields
     google_event_id = models.CharField(max_length=255, blank=True, null=True, 
@@ -59,6 +99,20 @@ class StudySession(models.Model):
                                        help_text="Whether to sync this session to Google Calendar")
     last_synced = models.DateTimeField(blank=True, null=True,
                                      help_text="Last time this session was synced to Google Calendar")
+    google_event_fingerprint = models.JSONField(blank=True, null=True,
+                                                help_text="Per-field hashes of the event payload last pushed to Google Calendar")
+    google_sync_status = models.CharField(
+        max_length=10,
+        choices=[
+            ('', 'Not synced'),
+            ('pending', 'Pending'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        blank=True,
+        default='',
+        help_text="State of the queued Google Calendar sync for this session"
+    )
     
     # Built-in notification fields
     notification_enabled = models.BooleanField(default=True, 
@@ -66,27 +120,90 @@ class StudySession(models.Model):
     notification_message = models.TextField(blank=True, null=True,
                                           help_text="Custom notification message")
     notification_sent = models.BooleanField(default=False,
-                                          help_text="Whether notification has been sent")
+                                          help_text="Whether the reminder has been handled (see notification_outcome)")
     notification_sent_at = models.DateTimeField(blank=True, null=True,
-                                               help_text="When notification was sent")
+                                               help_text="When notification was sent (empty if nothing was sent)")
+    notification_outcome = models.CharField(
+        max_length=10,
+        choices=[
+            ('', 'Pending'),
+            ('sent', 'Sent'),
+            ('late', 'Sent late'),
+            ('collapsed', 'Sent in a summary'),
+            ('expired', 'Expired unsent'),
+            ('skipped', 'Skipped (created after its reminder time)'),
+        ],
+        blank=True,
+        default='',
+        help_text="How the reminder was handled"
+    )
+    notification_claim = models.CharField(max_length=32, blank=True, null=True,
+                                          help_text="Token of the scheduler batch that claimed this reminder")
     reminder_minutes = models.IntegerField(default=30,
                                          help_text="Minutes before session to send reminder")
     # Google Calendar notification sync
     google_notification_event_id = models.CharField(max_length=255, blank=True, null=True,
                                                    help_text="Google Calendar notification event ID")
+    # Stored reminder time so the scheduler can ask the database for due sessions
+    notify_at = models.DateTimeField(blank=True, null=True,
+                                     help_text="When the reminder for this session is due")
 
     class Meta:
         ordering = ['-study_date', '-start_time']
+        indexes = [
+            # Partial index covering only sessions still waiting for a reminder
+            models.Index(
+                fields=['notify_at'],
+                name='tracker_session_due_idx',
+                condition=models.Q(notification_enabled=True, notification_sent=False, status='Planned'),
+            ),
+            # Calendar range queries
+            models.Index(fields=['user', 'study_date'], name='tracker_session_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subject} - {self.study_date} {self.start_time}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so counters can tell when it changes
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
     def save(self, *args, **kwargs):
+        self.update_derived_fields()
+        
+        # Keep notify_at in step when only some fields are being saved
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and NOTIFY_AT_SOURCE_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'notify_at'}
+        super().save(*args, **kwargs)
+    
+    def update_derived_fields(self):
+        """Recompute duration and notify_at (also needed before bulk_update)"""
         if self.start_time and self.end_time:
             start_datetime = datetime.combine(datetime.today(), self.start_time)
             end_datetime = datetime.combine(datetime.today(), self.end_time)
             self.duration = end_datetime - start_datetime
-        super().save(*args, **kwargs)
+        self.notify_at = self.compute_notify_at()
+    
+    @staticmethod
+    def started_before(now):
+        """Q matching sessions that started before `now` (compared in local time, as stored)"""
+        local_now = timezone.localtime(now)
+        return Q(study_date__lt=local_now.date()) | Q(study_date=local_now.date(), start_time__lt=local_now.time())
+    
+    def get_session_datetime(self):
+        """Get the timezone-aware start of this session"""
+        from django.utils import timezone
+        return timezone.make_aware(datetime.combine(self.study_date, self.start_time))
+    
+    def compute_notify_at(self):
+        """Calculate when the reminder for this session is due"""
+        if not self.study_date or not self.start_time or self.reminder_minutes is None:
+            return None
+        return self.get_session_datetime() - timedelta(minutes=self.reminder_minutes)
     
     def get_default_notification_message(self):
         """Get the default notification message for this session"""
@@ -94,32 +211,87 @@ class StudySession(models.Model):
             return self.notification_message
         return f"Your study session '{self.subject}' is starting in {self.reminder_minutes} minutes at {self.start_time.strftime('%H:%M')}."
     
+    def get_late_notification_message(self):
+        """Reminder text for a session that had already started when its reminder went out"""
+        message = (f"Your study session '{self.subject}' started at {self.start_time.strftime('%H:%M')} "
+                   f"on {self.study_date}. This reminder could not be sent on time.")
+        if self.notification_message:
+            return f"{self.notification_message}\n{message}"
+        return message
+    
     def should_send_notification(self):
         """Check if notification should be sent for this session"""
         from django.utils import timezone
-        from datetime import datetime, timedelta
         
         if not self.notification_enabled or self.notification_sent or self.status != 'Planned':
             return False
         
         # Calculate notification time
-        session_datetime = datetime.combine(self.study_date, self.start_time)
-        session_datetime = timezone.make_aware(session_datetime)
-        notification_time = session_datetime - timedelta(minutes=self.reminder_minutes)
+        session_datetime = self.get_session_datetime()
+        notification_time = self.compute_notify_at()
         
         # Check if it's time to send notification (with a 2-minute window for better accuracy)
         now = timezone.now()
-        time_window = timedelta(minutes=2)
         
         # Send notification if we're within the time window and before the session starts
-        return (notification_time - time_window <= now <= session_datetime)
+        return (notification_time - NOTIFICATION_WINDOW <= now <= session_datetime)
     
     def mark_notification_sent(self):
         """Mark notification as sent"""
         from django.utils import timezone
         self.notification_sent = True
         self.notification_sent_at = timezone.now()
-        self.save(update_fields=['notification_sent', 'notification_sent_at'])
+        self.notification_outcome = 'sent'
+        self.save(update_fields=['notification_sent', 'notification_sent_at', 'notification_outcome'])
+
+class GoogleSyncOutbox(models.Model):
+    """Google Calendar change queued in the same transaction as the session change
+    
+    Rows are drained by `manage.py run_sync_worker`. session_key keeps the
+    per-session ordering even after the session row itself is deleted.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    study_session = models.ForeignKey(StudySession, on_delete=models.SET_NULL, blank=True, null=True)
+    session_key = models.BigIntegerField(help_text="ID of the session this change belongs to")
+    operation = models.CharField(
+        max_length=10,
+        choices=[
+            ('sync', 'Sync'),
+            ('delete', 'Delete'),
+        ],
+        default='sync'
+    )
+    google_event_id = models.CharField(max_length=255, blank=True, null=True,
+                                       help_text="Event to remove for delete operations")
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            ('pending', 'Pending'),
+            ('processing', 'Processing'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        default='pending'
+    )
+    attempts = models.IntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now,
+                                        help_text="Earliest time the next attempt may run")
+    locked_by = models.CharField(max_length=255, blank=True, null=True,
+                                 help_text="Worker currently processing this entry")
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='tracker_outbox_ready_idx'),
+            models.Index(fields=['session_key', 'status'], name='tracker_outbox_session_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.operation} session {self.session_key} ({self.status})"
 
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -142,6 +314,169 @@ class Notification(models.Model):
         ordering = ['-created_at']
         # Add unique constraint to prevent duplicate notifications
         unique_together = [['user', 'study_session', 'notification_type', 'title']]
+        indexes = [
+            # Serves the keyset-paginated notification list without a sort
+            models.Index(fields=['user', '-created_at', '-id'], name='tracker_notification_page_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so counters can tell what changed
+        instance._loaded_is_read = instance.__dict__.get('is_read')
+        instance._loaded_type = instance.__dict__.get('notification_type')
+        return instance
+
+class UserCounters(models.Model):
+    """Per-user totals kept current on every write so dashboard stats are a single-row lookup
+    
+    Updated with F() deltas from tracker.signals. A missing row is rebuilt
+    from one conditional-aggregate query.
+    
+    data_version goes up (and updated_at moves) on every write to the user's
+    sessions or notifications, including raw queryset updates, which call
+    touch(). The read APIs derive their ETag from it.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='counters')
+    total_sessions = models.IntegerField(default=0)
+    planned_sessions = models.IntegerField(default=0)
+    completed_sessions = models.IntegerField(default=0)
+    missed_sessions = models.IntegerField(default=0)
+    total_notifications = models.IntegerField(default=0)
+    unread_notifications = models.IntegerField(default=0)
+    reminder_notifications = models.IntegerField(default=0)
+    achievement_notifications = models.IntegerField(default=0)
+    system_notifications = models.IntegerField(default=0)
+    data_version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    # StudySession.status -> counter field
+    SESSION_STATUS_FIELDS = {
+        'Planned': 'planned_sessions',
+        'Completed': 'completed_sessions',
+        'Missed': 'missed_sessions',
+    }
+    # Notification.notification_type -> counter field
+    NOTIFICATION_TYPE_FIELDS = {
+        'reminder': 'reminder_notifications',
+        'achievement': 'achievement_notifications',
+        'system': 'system_notifications',
+    }
+    NOTIFICATION_FIELDS = ['total_notifications', 'unread_notifications'] + list(NOTIFICATION_TYPE_FIELDS.values())
+    
+    def __str__(self):
+        return f"Counters for {self.user_id}"
+    
+    @classmethod
+    def notification_aggregates(cls):
+        """Conditional aggregates computing every notification counter in one pass"""
+        return {
+            'total_notifications': Count('id'),
+            'unread_notifications': Count('id', filter=Q(is_read=False)),
+            **{field: Count('id', filter=Q(notification_type=notification_type))
+               for notification_type, field in cls.NOTIFICATION_TYPE_FIELDS.items()},
+        }
+    
+    @classmethod
+    def aggregate_for(cls, user_id):
+        """Compute every counter for a user from scratch (one query per source table)"""
+        counts = StudySession.objects.filter(user_id=user_id).aggregate(
+            total_sessions=Count('id'),
+            **{field: Count('id', filter=Q(status=status)) for status, field in cls.SESSION_STATUS_FIELDS.items()}
+        )
+        counts.update(Notification.objects.filter(user_id=user_id).aggregate(**cls.notification_aggregates()))
+        return counts
+    
+    @classmethod
+    def refresh_notification_counts(cls, user_ids):
+        """Recount notifications for many users with one grouped query
+        
+        For bulk inserts that cannot tell which rows were actually created
+        (bulk_create with ignore_conflicts).
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        rows = {
+            row.pop('user_id'): row
+            for row in Notification.objects.filter(user_id__in=user_ids)
+            .values('user_id').annotate(**cls.notification_aggregates()).order_by()
+        }
+        existing = {counters.user_id: counters for counters in cls.objects.filter(user_id__in=user_ids)}
+        now = timezone.now()
+        for user_id, counters in existing.items():
+            for field in cls.NOTIFICATION_FIELDS:
+                setattr(counters, field, rows.get(user_id, {}).get(field, 0))
+            counters.data_version = F('data_version') + 1
+            counters.updated_at = now
+        cls.objects.bulk_update(existing.values(), cls.NOTIFICATION_FIELDS + ['data_version', 'updated_at'])
+        for user_id in user_ids - set(existing):
+            cls.rebuild(user_id)
+    
+    @classmethod
+    def rebuild(cls, user_id):
+        counts = cls.aggregate_for(user_id)
+        counters, created = cls.objects.get_or_create(user_id=user_id, defaults=counts)
+        if not created:
+            cls.objects.filter(user_id=user_id).update(
+                data_version=F('data_version') + 1, updated_at=timezone.now(), **counts
+            )
+            counters.refresh_from_db()
+        return counters
+    
+    @classmethod
+    def for_user(cls, user_id):
+        """The user's counters row, rebuilt if it does not exist yet"""
+        counters = cls.objects.filter(user_id=user_id).first()
+        return counters if counters is not None else cls.rebuild(user_id)
+    
+    @classmethod
+    def apply_delta(cls, user_id, deltas, create=True):
+        """Atomically add `deltas` ({field: n}) to the user's counters and bump data_version
+        
+        When the row does not exist yet it is rebuilt from the tables (which
+        already include this change) unless create is False.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        updated = cls.objects.filter(user_id=user_id).update(
+            data_version=F('data_version') + 1,
+            updated_at=timezone.now(),
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated and create:
+            cls.rebuild(user_id)
+    
+    @classmethod
+    def touch(cls, user_ids):
+        """Bump data_version for writes that bypass the signals (queryset update/bulk_update)"""
+        cls.objects.filter(user_id__in=set(user_ids)).update(
+            data_version=F('data_version') + 1, updated_at=timezone.now()
+        )
+    
+    @classmethod
+    def session_deltas(cls, added_status=None, removed_status=None):
+        """Counter changes for a session created with, deleted with or moved between statuses"""
+        deltas = {}
+        if added_status is not None and removed_status is None:
+            deltas['total_sessions'] = 1
+        if removed_status is not None and added_status is None:
+            deltas['total_sessions'] = -1
+        for status, sign in ((added_status, 1), (removed_status, -1)):
+            field = cls.SESSION_STATUS_FIELDS.get(status)
+            if field:
+                deltas[field] = deltas.get(field, 0) + sign
+        return deltas
+    
+    @classmethod
+    def notification_deltas(cls, notification_type, is_read, sign=1):
+        """Counter changes for adding (sign=1) or removing (sign=-1) one notification"""
+        deltas = {'total_notifications': sign}
+        if not is_read:
+            deltas['unread_notifications'] = sign
+        field = cls.NOTIFICATION_TYPE_FIELDS.get(notification_type)
+        if field:
+            deltas[field] = sign
+        return deltas
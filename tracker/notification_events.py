@@ -0,0 +1,192 @@
+"""
+Live notification delivery over Server-Sent Events.
+
+Every open tab holds one `/api/notifications/stream/` connection instead of
+polling. Writers call `notify_user(user_id)` after changing a user's
+notifications; once the transaction commits, the in-process bus wakes that
+user's streams, which read the counters row and send the new counts and
+any new notifications.
+
+The bus only reaches streams in the writer's own process. Reminders
+created by a separate `run_scheduler` or by another web worker arrive
+through the database instead: each stream checks its user's
+UserCounters.data_version every NOTIFICATION_STREAM_POLL_SECONDS, so they
+show up within that interval. An idle check is one primary-key lookup.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+# An idle stream sends a comment at least this often so proxies keep it open
+KEEPALIVE_SECONDS = 15
+
+
+def serialize_notification(notification):
+    """JSON body for one notification, as returned by the notifications API"""
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat(),
+        'study_session': {
+            'id': notification.study_session.id,
+            'subject': notification.study_session.subject,
+            'study_date': notification.study_session.study_date.isoformat(),
+        } if notification.study_session else None
+    }
+
+
+def counts_payload(counters):
+    """Notification counts from a UserCounters row, as returned by the counts API"""
+    from .models import Notification, UserCounters
+    counts_by_type = {}
+    for choice in Notification._meta.get_field('notification_type').choices:
+        type_key = choice[0]
+        counts_by_type[type_key] = getattr(counters, UserCounters.NOTIFICATION_TYPE_FIELDS[type_key])
+    return {
+        'total': counters.total_notifications,
+        'unread': counters.unread_notifications,
+        'by_type': counts_by_type
+    }
+
+
+class Subscription:
+    """One stream's wake-up flag; repeated publishes before it wakes coalesce into one"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self):
+        self.event.set()
+
+    async def wait(self, timeout):
+        """Wait for a publish; returns False if the timeout passed first"""
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+
+class NotificationBus:
+    """In-process fan-out from writers (any thread) to the streams of each user"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.wake)
+            except RuntimeError:
+                # The stream's event loop already closed
+                self.unsubscribe(subscription)
+
+
+notification_bus = NotificationBus()
+
+
+def notify_user(user_id):
+    """Wake the user's open streams once the current transaction commits"""
+    transaction.on_commit(lambda: notification_bus.publish(user_id))
+
+
+def notify_users(user_ids):
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: [notification_bus.publish(user_id) for user_id in user_ids])
+
+
+def format_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def _read_state(user_id, last_id, previous_version=None):
+    """Current counts and data version, plus unread notifications newer than last_id
+
+    last_id None starts from the newest notification. New notifications are
+    only looked up when the data version moved since previous_version, so
+    an idle check costs one counters lookup. (The total alone is not enough:
+    a create and a delete in the same interval leave it unchanged.)
+    """
+    from .models import Notification, UserCounters
+    counters = UserCounters.for_user(user_id)
+    counts = counts_payload(counters)
+    notifications = Notification.objects.filter(user_id=user_id)
+    if last_id is None:
+        newest = notifications.order_by('-id').values_list('id', flat=True).first()
+        return counts, [], newest or 0, counters.data_version
+    if previous_version is not None and counters.data_version == previous_version:
+        return counts, [], last_id, counters.data_version
+    new = list(
+        notifications.filter(id__gt=last_id, is_read=False)
+        .select_related('study_session').order_by('-id')[:settings.NOTIFICATION_STREAM_MAX_BATCH]
+    )
+    return counts, [serialize_notification(notification) for notification in reversed(new)], \
+        new[0].id if new else last_id, counters.data_version
+
+
+async def notification_event_stream(user_id, last_event_id=None):
+    """Yield SSE messages for one user until NOTIFICATION_STREAM_MAX_SECONDS passes
+
+    The browser reconnects on its own afterwards, sending the last event id
+    (the newest notification id it knows of) as Last-Event-ID, so
+    notifications created in between are still delivered.
+    """
+    read_state = sync_to_async(_read_state)
+    subscription = notification_bus.subscribe(user_id)
+    try:
+        counts, notifications, last_id, version = await read_state(user_id, last_event_id)
+        yield f'retry: {settings.NOTIFICATION_STREAM_RETRY_MS}\n\n'
+        yield format_event('counts', counts, last_id)
+        for notification in notifications:
+            yield format_event('notification', notification, notification['id'])
+
+        deadline = time.monotonic() + settings.NOTIFICATION_STREAM_MAX_SECONDS
+        last_sent = time.monotonic()
+        while time.monotonic() < deadline:
+            await subscription.wait(settings.NOTIFICATION_STREAM_POLL_SECONDS)
+            latest, notifications, last_id, version = await read_state(user_id, last_id, version)
+            if latest != counts:
+                counts = latest
+                last_sent = time.monotonic()
+                yield format_event('counts', counts, last_id)
+            for notification in notifications:
+                last_sent = time.monotonic()
+                yield format_event('notification', notification, notification['id'])
+            if time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ': keepalive\n\n'
+    finally:
+        notification_bus.unsubscribe(subscription)
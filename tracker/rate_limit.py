@@ -0,0 +1,194 @@
+"""
+Rate limiting and retry for Google Calendar API calls.
+
+Every Calendar request made by GoogleCalendarService goes through
+`calendar_rate_limiter`, which holds one global token bucket (project quota)
+plus one bucket per user (per-user quota). When Google still answers with
+a rate-limit error the affected buckets are paused for the advised delay,
+so the other threads in this process slow down too instead of piling on.
+
+Rate-limit rejections are always safe to retry because Google did not
+apply the request. Server errors and dropped connections are only retried
+for idempotent operations, since a non-idempotent insert may already have
+gone through.
+"""
+
+import email.utils
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no token became available within the acquire timeout"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens=1):
+        """Take `tokens` now, returning how long the caller must wait before using them
+
+        The balance may go negative, so a request larger than the bucket
+        (a batch) simply waits longer instead of being refused.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def release(self, tokens=1):
+        """Give back tokens reserved for a call that will not be made"""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds` (adaptive backoff after a rate-limit error)"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    """Global plus per-user token buckets, with retries for Calendar requests"""
+
+    def __init__(self, rate, burst, user_rate, user_burst, max_users=1024):
+        self.global_bucket = TokenBucket(rate, burst)
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.max_users = max_users
+        self._user_buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bucket_for(self, user_id):
+        with self._lock:
+            bucket = self._user_buckets.get(user_id)
+            if bucket is None:
+                bucket = TokenBucket(self.user_rate, self.user_burst)
+                self._user_buckets[user_id] = bucket
+                while len(self._user_buckets) > self.max_users:
+                    self._user_buckets.popitem(last=False)
+            else:
+                self._user_buckets.move_to_end(user_id)
+            return bucket
+
+    def acquire(self, user_id, tokens=1, timeout=None):
+        """Block until `tokens` calls may be made for `user_id`"""
+        if timeout is None:
+            timeout = settings.GOOGLE_API_ACQUIRE_TIMEOUT
+        user_bucket = self.bucket_for(user_id)
+        wait = max(self.global_bucket.reserve(tokens), user_bucket.reserve(tokens))
+        if wait > timeout:
+            self.global_bucket.release(tokens)
+            user_bucket.release(tokens)
+            raise RateLimitTimeout(f"Google Calendar rate limit: no capacity within {timeout}s")
+        if wait > 0:
+            time.sleep(wait)
+
+    def backoff(self, user_id, seconds, user_only=False):
+        self.bucket_for(user_id).pause(seconds)
+        if not user_only:
+            self.global_bucket.pause(seconds)
+
+    def execute(self, user_id, request, idempotent=True, tokens=1, http=None):
+        """Run `request.execute()` under the rate limit, retrying where it is safe
+
+        `http` replaces the http object the request was built with (e.g. one
+        owned by the calling thread).
+        """
+        max_retries = settings.GOOGLE_API_MAX_RETRIES
+        attempt = 0
+        while True:
+            self.acquire(user_id, tokens)
+            try:
+                return request.execute(http=http)
+            except HttpError as error:
+                if is_rate_limit_error(error):
+                    delay = max(retry_after_seconds(error) or 0, backoff_delay(attempt))
+                    # Per-user quota only slows this user down
+                    self.backoff(user_id, delay, user_only=error_reason(error) == 'userRateLimitExceeded')
+                elif idempotent and error.resp.status in RETRYABLE_STATUSES:
+                    delay = max(retry_after_seconds(error) or 0, backoff_delay(attempt))
+                else:
+                    raise
+                if attempt >= max_retries:
+                    raise
+            except OSError:
+                if not idempotent or attempt >= max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+
+            attempt += 1
+            logger.warning(f"Google Calendar request for user {user_id} failed, retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def error_reason(error):
+    """Reason code of a Google API error, e.g. 'rateLimitExceeded'"""
+    details = getattr(error, 'error_details', None)
+    if isinstance(details, list):
+        for detail in details:
+            if isinstance(detail, dict) and detail.get('reason'):
+                return detail['reason']
+    try:
+        content = json.loads(error.content.decode('utf-8'))
+        return content['error']['errors'][0]['reason']
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        return None
+
+
+def is_rate_limit_error(error):
+    status = error.resp.status
+    return status == 429 or (status == 403 and error_reason(error) in RATE_LIMIT_REASONS)
+
+
+def retry_after_seconds(error):
+    """Delay advised by the Retry-After header, in seconds, if any"""
+    value = error.resp.get('retry-after') if hasattr(error.resp, 'get') else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with jitter, so retrying callers spread out"""
+    ceiling = min(settings.GOOGLE_API_BACKOFF_MAX, settings.GOOGLE_API_BACKOFF_BASE * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+
+calendar_rate_limiter = RateLimiter(
+    rate=settings.GOOGLE_API_RATE,
+    burst=settings.GOOGLE_API_BURST,
+    user_rate=settings.GOOGLE_API_USER_RATE,
+    user_burst=settings.GOOGLE_API_USER_BURST,
+)
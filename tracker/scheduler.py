@@ -1,9 +1,19 @@
 import logging
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.date import DateTrigger
-from django.utils import timezone
 from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Mod
+from django.utils import timezone
+from . import metrics
+from .leader import LeaderLease, process_identity
+from .worker_pool import BoundedWorkerPool
 import atexit
+import os
+import sys
+import time
+import uuid
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,65 +22,358 @@ logger = logging.getLogger(__name__)
 # Global scheduler instance
 scheduler = None
 
+# Leases this process competes for, keyed by shard index (one 'scheduler' lease when unsharded)
+leases = {}
+
+# Shard this process prefers to own; None means it competes for every shard equally
+home_shard = None
+
+# Jobs that run in every candidate process, leader or not
+HEARTBEAT_JOB_ID = 'scheduler_leader_heartbeat'
+
+# Leader job applying ReminderJobChange rows in event mode, and how many it takes per run
+REMINDER_JOB_CHANGES_JOB_ID = 'apply_reminder_job_changes'
+REMINDER_JOB_CHANGES_BATCH = 500
+
+# Session fields a reminder job depends on; saves touching none of them leave the job alone
+REMINDER_JOB_FIELDS = {
+    'study_date', 'start_time', 'reminder_minutes', 'notify_at',
+    'status', 'notification_enabled', 'notification_sent',
+}
+
+# Scheduler instrumentation, exposed through the metrics registry
+TICK_SECONDS = metrics.registry.histogram(
+    'tracker_scheduler_tick_seconds', 'Time spent dispatching one batch of reminders'
+)
+SESSIONS_EXAMINED = metrics.registry.counter(
+    'tracker_scheduler_sessions_examined_total', 'Due sessions read by the scheduler'
+)
+REMINDERS_DISPATCHED = metrics.registry.counter(
+    'tracker_scheduler_reminders_dispatched_total', 'Reminders delivered by the scheduler'
+)
+GOOGLE_UPDATES = metrics.registry.counter(
+    'tracker_scheduler_google_updates_total', 'Google Calendar notification updates by outcome'
+)
+REMINDER_LAG_SECONDS = metrics.registry.histogram(
+    'tracker_reminder_lag_seconds', 'Delay between a reminder being due (start - reminder_minutes) and being sent',
+    buckets=(1, 5, 15, 30, 60, 90, 120, 180, 300, 600, 1800, 3600)
+)
+REMINDER_BACKLOG = metrics.registry.gauge(
+    'tracker_reminder_backlog', 'Overdue reminders that have not been delivered yet'
+)
+
+REMINDERS_RECOVERED = metrics.registry.counter(
+    'tracker_reminders_recovered_total', 'Missed reminders handled by the recovery pass, by outcome'
+)
+
+# How reminders missed while the engine was unavailable are handled
+MISSED_NOTIFICATION_POLICIES = ('deliver', 'collapse', 'expire')
+
+# StudySession.notification_outcome recorded for each recovery outcome; 'skip' is for
+# sessions added after their reminder time, whose reminder was never missed
+RECOVERY_OUTCOMES = {'deliver': 'late', 'collapse': 'collapsed', 'expire': 'expired', 'skip': 'skipped'}
+
+# Outcomes that leave notification_sent_at empty because nothing was sent
+UNSENT_OUTCOMES = ('expired', 'skipped')
+
+# Bounded pool running Google Calendar updates outside the dispatch loop
+google_pool = None
+
+# Point up to which event-mode jobs have been reconciled with the database
+_reconciled_since = None
+
+def get_scheduler_mode():
+    """Return 'interval' (poll every minute) or 'event' (one exact-time job per session)"""
+    return getattr(settings, 'NOTIFICATION_SCHEDULER_MODE', 'interval')
+
+def get_shard_count():
+    """Number of user partitions reminder dispatch is split into"""
+    return max(getattr(settings, 'SCHEDULER_SHARDS', 1), 1)
+
+def owned_shards():
+    """Shard indexes whose lease this process currently holds"""
+    return {index for index, lease in leases.items() if lease.is_leader}
+
+def is_scheduler_leader():
+    """Whether this process currently holds at least one scheduler lease"""
+    return scheduler is not None and bool(owned_shards())
+
+def filter_owned_shards(queryset):
+    """Limit a queryset with a user_id column to the users of the shards this process owns"""
+    shard_count = get_shard_count()
+    if shard_count == 1:
+        return queryset
+    return queryset.annotate(shard=Mod('user_id', shard_count)).filter(shard__in=owned_shards())
+
+def should_autostart_scheduler(argv=None):
+    """Decide whether app loading should start the scheduler in this process
+    
+    Only the serving process of ``manage.py runserver`` starts it automatically.
+    WSGI/ASGI workers and other management commands skip it; production
+    deployments run ``manage.py run_scheduler`` instead.
+    """
+    argv = sys.argv if argv is None else argv
+    
+    if not getattr(settings, 'SCHEDULER_AUTOSTART', True):
+        return False
+    if len(argv) < 2 or os.path.basename(argv[0]) != 'manage.py' or argv[1] != 'runserver':
+        return False
+    # The autoreloader parent only watches files; the child serving requests has RUN_MAIN set
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in argv
+
+def session_job_id(session_id):
+    """Job id used for a session's reminder in event mode"""
+    return f'session_notification_{session_id}'
+
 def send_study_notification():
     """Check for study sessions that need notifications and send them"""
     try:
-        from .models import StudySession
-        
-        # Get sessions that should receive notifications
-        sessions_to_notify = StudySession.objects.filter(
-            notification_enabled=True,
-            notification_sent=False,
-            status='Planned'
-        )
-        
-        for session in sessions_to_notify:
-            if session.should_send_notification():
-                # Send notification using the session's built-in fields
-                send_session_notification(session)
-        
+        dispatch_due_notifications()
     except Exception as e:
         logger.error(f"Error checking for notifications: {e}")
 
-def send_session_notification(session):
-    """Send notification for a specific study session"""
+def get_google_pool():
+    """Get (and lazily create) the worker pool for Google Calendar side-effects"""
+    global google_pool
+    
+    if google_pool is None:
+        google_pool = BoundedWorkerPool(
+            'google-calendar',
+            max_workers=getattr(settings, 'GOOGLE_SYNC_WORKERS', 4),
+            max_queue=getattr(settings, 'GOOGLE_SYNC_QUEUE_SIZE', 100)
+        )
+    return google_pool
+
+def dispatch_due_notifications(session_ids=None):
+    """Claim every due session and send its reminder as one batch
+    
+    Returns a dict with how many sessions were examined, claimed by this
+    process and handed to Google Calendar.
+    """
+    started = time.monotonic()
     try:
-        # Mark notification as sent in the StudySession itself
-        session.mark_notification_sent()
-        
-        # Create a user-visible notification on the website
-        create_user_notification(session)
+        counts = _dispatch_batch(session_ids)
+    finally:
+        TICK_SECONDS.observe(time.monotonic() - started)
+    
+    SESSIONS_EXAMINED.inc(counts['examined'])
+    REMINDERS_DISPATCHED.inc(counts['claimed'])
+    GOOGLE_UPDATES.inc(counts['google_updates'], outcome='queued')
+    GOOGLE_UPDATES.inc(counts['google_deferred'], outcome='deferred')
+    
+    if session_ids is None:
+        check_reminder_backlog()
+    return counts
+
+def record_reminder_backlog():
+    """Update the gauge of reminders that are overdue but still undelivered"""
+    from .models import StudySession
+    
+    backlog = filter_owned_shards(StudySession.objects.filter(
+        notification_enabled=True,
+        notification_sent=False,
+        status='Planned',
+        notify_at__lt=timezone.now()
+    )).count()
+    REMINDER_BACKLOG.set(backlog)
+    return backlog
+
+def check_reminder_backlog():
+    """Record the backlog and recover missed reminders when the engine has fallen behind"""
+    # Anything still overdue after a tick has delivered every due reminder means lag
+    if record_reminder_backlog():
+        recover_missed_notifications()
+
+def recover_missed_notifications(policy=None):
+    """Handle reminders whose send window passed while the engine was unavailable
+    
+    Depending on MISSED_NOTIFICATION_POLICY each missed reminder is delivered
+    late ('deliver'), folded into one summary per user ('collapse') or just
+    closed off ('expire'). Sessions that started more than
+    MISSED_NOTIFICATION_MAX_AGE_HOURS ago are always expired, and sessions
+    created after their reminder time are closed off without a notification
+    ('skip'), since nothing was pending while their window was open.
+    Returns the number of reminders per outcome.
+    """
+    from datetime import timedelta
+    from .models import StudySession, Notification, UserCounters
+    from .notification_events import notify_users
+    
+    policy = policy or getattr(settings, 'MISSED_NOTIFICATION_POLICY', 'deliver')
+    if policy not in MISSED_NOTIFICATION_POLICIES:
+        raise ValueError(f"Unknown missed notification policy: {policy}")
+    
+    now = timezone.now()
+    max_age = timedelta(hours=getattr(settings, 'MISSED_NOTIFICATION_MAX_AGE_HOURS', 24))
+    counts = {outcome: 0 for outcome in RECOVERY_OUTCOMES}
+    
+    # A reminder is missed once its session has started without it being sent
+    overdue = filter_owned_shards(StudySession.objects.filter(
+        StudySession.started_before(now),
+        notification_enabled=True,
+        notification_sent=False,
+        status='Planned',
+        notify_at__lt=now
+    )).only(
+        'id', 'user_id', 'subject', 'study_date', 'start_time', 'reminder_minutes',
+        'notification_message', 'notify_at', 'created_at'
+    )
+    missed_by_outcome = {}
+    for session in overdue:
+        if session.created_at > session.notify_at:
+            outcome = 'skip'
+        elif session.get_session_datetime() < now - max_age:
+            outcome = 'expire'
+        else:
+            outcome = policy
+        missed_by_outcome.setdefault(outcome, {})[session.id] = session
+    if not missed_by_outcome:
+        return counts
+    
+    with transaction.atomic():
+        missed = {}
+        outcomes = {}
+        for outcome, sessions in missed_by_outcome.items():
+            won = _claim_sessions(sessions, now, RECOVERY_OUTCOMES[outcome])
+            missed.update(won)
+            outcomes.update((session_id, outcome) for session_id in won)
         
-        # If Google Calendar sync is enabled, update the main session event with notification time
-        if session.sync_to_google and session.google_event_id:
-            try_update_session_with_notification_time(session)
+        notifications = []
+        collapsed_by_user = {}
+        for session in missed.values():
+            if outcomes[session.id] == 'deliver':
+                notifications.append(_build_reminder_notification(session, session.get_late_notification_message()))
+            elif outcomes[session.id] == 'collapse':
+                collapsed_by_user.setdefault(session.user_id, []).append(session)
         
-        logger.info(f"Notification sent for session: {session.subject} to {session.user.username}")
+        summary_time = timezone.localtime(now).strftime('%Y-%m-%d %H:%M')
+        for user_id, sessions in collapsed_by_user.items():
+            lines = '\n'.join(
+                f"- {session.subject} ({session.study_date} {session.start_time.strftime('%H:%M')})"
+                for session in sessions
+            )
+            notifications.append(Notification(
+                user_id=user_id,
+                notification_type='reminder',
+                title=f"🔔 Missed Study Reminders ({summary_time})",
+                message=f"These reminders could not be sent on time:\n{lines}"
+            ))
         
-    except Exception as e:
-        logger.error(f"Error sending notification for session {session.id}: {e}")
+        Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+        # Conflicting rows are silently skipped, so recount rather than add
+        UserCounters.refresh_notification_counts(notification.user_id for notification in notifications)
+        notify_users(notification.user_id for notification in notifications)
+    
+    for session_id, outcome in outcomes.items():
+        counts[outcome] += 1
+        if outcome in ('deliver', 'collapse'):
+            REMINDER_LAG_SECONDS.observe(max((now - missed[session_id].notify_at).total_seconds(), 0))
+    for outcome, count in counts.items():
+        REMINDERS_RECOVERED.inc(count, outcome=outcome)
+    
+    logger.warning(
+        f"Recovered {len(missed)} missed notifications "
+        f"({counts['deliver']} delivered, {counts['collapse']} collapsed, {counts['expire']} expired, "
+        f"{counts['skip']} skipped as created after their reminder time)"
+    )
+    return counts
 
-def create_user_notification(session):
-    """Create a notification that appears on the website for the user"""
-    try:
-        from .models import Notification
-        
-        # Create a notification that will appear in the user's notification list
-        notification, created = Notification.objects.get_or_create(
-            user=session.user,
-            study_session=session,
-            notification_type='reminder',
-            title=f"🔔 Study Reminder: {session.subject}",
-            defaults={
-                'message': session.get_default_notification_message(),
-            }
-        )
-        
-        if created:
-            logger.info(f"Created user notification for session: {session.subject}")
+def _claim_sessions(sessions, now, outcome='sent'):
+    """Mark sessions as handled with `outcome` in one UPDATE and return the ones this batch won
+    
+    Must run inside a transaction together with the notification insert.
+    Expired and skipped reminders keep notification_sent_at empty since nothing was sent.
+    """
+    from .models import StudySession
+    
+    claim = uuid.uuid4().hex
+    # Rows already taken by another process are skipped by the notification_sent condition
+    claimed = StudySession.objects.filter(id__in=sessions, notification_sent=False).update(
+        notification_sent=True,
+        notification_sent_at=None if outcome in UNSENT_OUTCOMES else now,
+        notification_outcome=outcome,
+        notification_claim=claim
+    )
+    if claimed < len(sessions):
+        won = set(StudySession.objects.filter(notification_claim=claim).values_list('id', flat=True))
+        sessions = {session_id: session for session_id, session in sessions.items() if session_id in won}
+    return sessions
+
+def _build_reminder_notification(session, message=None):
+    """Build (without saving) the in-app reminder for a session"""
+    from .models import Notification
+    
+    return Notification(
+        user_id=session.user_id,
+        study_session_id=session.id,
+        notification_type='reminder',
+        title=f"🔔 Study Reminder: {session.subject}",
+        message=message or session.get_default_notification_message()
+    )
+
+def _dispatch_batch(session_ids):
+    from .models import StudySession, Notification, UserCounters, NOTIFICATION_WINDOW
+    from .notification_events import notify_users
+    
+    now = timezone.now()
+    counts = {'examined': 0, 'claimed': 0, 'google_updates': 0, 'google_deferred': 0}
+    
+    # Only ask the database for sessions whose reminder is due (uses the partial notify_at index);
+    # sessions that already started are left to recover_missed_notifications
+    candidates = filter_owned_shards(StudySession.objects.filter(
+        ~StudySession.started_before(now),
+        notification_enabled=True,
+        notification_sent=False,
+        status='Planned',
+        notify_at__lte=now + NOTIFICATION_WINDOW
+    )).select_related('user')
+    if session_ids is not None:
+        candidates = candidates.filter(id__in=session_ids)
+    
+    candidates = list(candidates)
+    counts['examined'] = len(candidates)
+    due = {session.id: session for session in candidates if session.should_send_notification()}
+    if not due:
+        return counts
+    
+    with transaction.atomic():
+        due = _claim_sessions(due, now)
         
-    except Exception as e:
-        logger.error(f"Error creating user notification: {e}")
+        # One INSERT for every reminder; the unique constraint drops duplicates
+        Notification.objects.bulk_create(
+            [_build_reminder_notification(session) for session in due.values()],
+            ignore_conflicts=True
+        )
+        UserCounters.refresh_notification_counts(session.user_id for session in due.values())
+        notify_users(session.user_id for session in due.values())
+    
+    counts['claimed'] = len(due)
+    for session in due.values():
+        REMINDER_LAG_SECONDS.observe(max((now - session.notify_at).total_seconds(), 0))
+    
+    # If Google Calendar sync is enabled, hand the event update to the worker pool
+    pool = get_google_pool()
+    submit_timeout = getattr(settings, 'GOOGLE_SYNC_SUBMIT_TIMEOUT', 1)
+    for session in due.values():
+        session.notification_sent = True
+        session.notification_sent_at = now
+        session.notification_outcome = 'sent'
+        if session.sync_to_google and session.google_event_id:
+            # Once the pool is full, stop waiting so in-app delivery is never held up
+            if pool.submit(try_update_session_with_notification_time, session, timeout=submit_timeout):
+                counts['google_updates'] += 1
+            else:
+                # notification_sent is already committed, so hand the update to the persistent outbox
+                defer_notification_update(session)
+                counts['google_deferred'] += 1
+                submit_timeout = 0
+    
+    logger.info(
+        f"Dispatched {counts['claimed']} notifications "
+        f"({counts['examined']} examined, {counts['google_updates']} Google Calendar updates queued, "
+        f"{counts['google_deferred']} deferred to the sync outbox)"
+    )
+    return counts
 
 def try_update_session_with_notification_time(session):
     """Update the main Google Calendar event to include notification reminder time"""
@@ -90,23 +393,199 @@ def try_update_session_with_notification_time(session):
             logger.info(f"Updated Google Calendar session event with notification time for {session.user.username}")
         else:
             logger.warning(f"Failed to update Google Calendar session with notification: {message}")
+            defer_notification_update(session)
             
     except GoogleCalendarIntegration.DoesNotExist:
         pass  # User doesn't have Google Calendar integration
     except Exception as e:
         logger.error(f"Error updating Google Calendar session with notification: {e}")
+        defer_notification_update(session)
 
-def start_scheduler():
-    """Start the background scheduler"""
-    global scheduler
+def defer_notification_update(session):
+    """Queue a session's Calendar event update in the sync outbox, where it is retried with backoff"""
+    from .sync_outbox import enqueue_session_sync
     
-    if scheduler is not None:
-        return  # Already started
+    try:
+        with transaction.atomic():
+            enqueue_session_sync(session)
+    except Exception as e:
+        logger.error(f"Error queueing Google Calendar update for session {session.id}: {e}")
+
+def send_scheduled_notification(session_id):
+    """Send the reminder for one session when its DateTrigger job fires"""
+    try:
+        dispatch_due_notifications(session_ids=[session_id])
+    except Exception as e:
+        logger.error(f"Error sending scheduled notification for session {session_id}: {e}")
+
+def _add_session_job(session_id, notify_at):
+    """Register or move the exact-time reminder job for a session"""
+    # Overdue reminders whose session has not started yet fire straight away
+    run_date = max(notify_at, timezone.now())
+    scheduler.add_job(
+        send_scheduled_notification,
+        DateTrigger(run_date=run_date),
+        args=[session_id],
+        id=session_job_id(session_id),
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+
+def queue_reminder_job_change(session_id, user_id):
+    """Have the scheduler leader re-plan a session's reminder job after it was saved or deleted
+    
+    Event mode only. Works from any process: the change is written in the
+    caller's transaction and the leader applies it within
+    REMINDER_JOB_POLL_SECONDS, or as soon as the transaction commits when
+    this process is the leader.
+    """
+    from .models import ReminderJobChange
     
+    if get_scheduler_mode() != 'event':
+        return
+    ReminderJobChange.objects.create(user_id=user_id, session_key=session_id)
+    transaction.on_commit(_wake_reminder_job_changes)
+
+def _wake_reminder_job_changes():
+    """Run the leader's change job now instead of at its next interval"""
+    if not is_scheduler_leader():
+        return
     try:
-        scheduler = BackgroundScheduler(timezone=timezone.get_current_timezone())
-        scheduler.start()
+        scheduler.modify_job(REMINDER_JOB_CHANGES_JOB_ID, next_run_time=timezone.now())
+    except JobLookupError:
+        pass  # Jobs are being rebuilt after a lease change
+
+def _plan_session_job(session_id, session):
+    """Register, move or cancel the reminder job of one session (None: it was deleted)"""
+    try:
+        is_pending = (
+            session is not None
+            and session.notification_enabled
+            and not session.notification_sent
+            and session.status == 'Planned'
+            and session.notify_at is not None
+            and session.get_session_datetime() >= timezone.now()
+        )
+        
+        if is_pending:
+            _add_session_job(session_id, session.notify_at)
+        else:
+            scheduler.remove_job(session_job_id(session_id))
+    except JobLookupError:
+        pass  # No job registered for this session
+    except Exception as e:
+        logger.error(f"Error scheduling notification for session {session_id}: {e}")
+
+def apply_reminder_job_changes():
+    """Re-plan the jobs of sessions saved or deleted (by any process) since the last run"""
+    from .models import ReminderJobChange, StudySession
+    
+    changes = list(
+        filter_owned_shards(ReminderJobChange.objects.all())
+        .order_by('id').values_list('id', 'session_key')[:REMINDER_JOB_CHANGES_BATCH]
+    )
+    if not changes:
+        return 0
+    
+    session_keys = {session_key for _, session_key in changes}
+    sessions = StudySession.objects.in_bulk(session_keys)
+    for session_key in session_keys:
+        _plan_session_job(session_key, sessions.get(session_key))
+    
+    # Changes queued while this ran have newer ids and are kept for the next run
+    ReminderJobChange.objects.filter(id__in=[change_id for change_id, _ in changes]).delete()
+    return len(session_keys)
+
+def rebuild_session_notification_jobs():
+    """Recreate every pending reminder job from the database in one pass"""
+    global _reconciled_since
+    from datetime import timedelta
+    from .models import StudySession
+    
+    now = timezone.now()
+    _reconciled_since = now
+    pending = filter_owned_shards(StudySession.objects.filter(
+        notification_enabled=True,
+        notification_sent=False,
+        status='Planned',
+        notify_at__isnull=False
+    )).values_list('id', 'notify_at', 'reminder_minutes')
+    
+    count = 0
+    for session_id, notify_at, reminder_minutes in pending.iterator():
+        # Skip sessions that have already started
+        if notify_at + timedelta(minutes=reminder_minutes) < now:
+            continue
+        _add_session_job(session_id, notify_at)
+        count += 1
+    
+    logger.info(f"Scheduled {count} session notification jobs")
+
+def reconcile_session_notification_jobs():
+    """Pick up session writes that bypass the model signals (bulk_update) since the last pass
+    
+    Saves and deletes reach the leader through ReminderJobChange; this
+    heartbeat-paced scan is only the safety net for raw updates.
+    """
+    global _reconciled_since
+    from .models import StudySession
+    
+    if _reconciled_since is None:
+        return  # Jobs have not been rebuilt yet
+    
+    since = _reconciled_since
+    _reconciled_since = timezone.now()
+    
+    for session in filter_owned_shards(StudySession.objects.filter(updated_at__gte=since)):
+        _plan_session_job(session.id, session)
+
+def refresh_google_credentials():
+    """Renew Google tokens of this process's users with Google work due shortly before they expire"""
+    try:
+        from .google_calendar_service import refresh_expiring_credentials
         
+        count = refresh_expiring_credentials(user_filter=filter_owned_shards)
+        if count:
+            logger.info(f"Refreshed Google Calendar credentials for {count} users")
+    except Exception as e:
+        logger.error(f"Error refreshing Google Calendar credentials: {e}")
+
+def _start_notification_jobs():
+    """Add the jobs that only lease holders run"""
+    # Keep tokens of users with queued syncs or due reminders ahead of expiry
+    scheduler.add_job(
+        refresh_google_credentials,
+        'interval',
+        minutes=5,
+        id='refresh_google_credentials',
+        next_run_time=timezone.now(),
+        replace_existing=True
+    )
+    
+    # Catch up on reminders missed while no process held the lease
+    scheduler.add_job(
+        recover_missed_notifications,
+        id='recover_missed_notifications',
+        replace_existing=True
+    )
+    
+    if get_scheduler_mode() == 'event':
+        # One exact-time job per pending session, rebuilt from the database
+        # on the scheduler's own thread rather than during app loading
+        scheduler.add_job(
+            rebuild_session_notification_jobs,
+            id='rebuild_session_notifications',
+            replace_existing=True
+        )
+        # Saves and deletes made by web workers and other processes
+        scheduler.add_job(
+            apply_reminder_job_changes,
+            'interval',
+            seconds=getattr(settings, 'REMINDER_JOB_POLL_SECONDS', 2),
+            id=REMINDER_JOB_CHANGES_JOB_ID,
+            replace_existing=True
+        )
+    else:
         # Add a job to check for notifications every minute
         scheduler.add_job(
             send_study_notification,
@@ -115,6 +594,90 @@ def start_scheduler():
             id='check_session_notifications',
             replace_existing=True
         )
+
+def _stop_notification_jobs():
+    """Remove the leader-only jobs after a lease was lost"""
+    global _reconciled_since
+    
+    _reconciled_since = None
+    for job in scheduler.get_jobs():
+        if job.id != HEARTBEAT_JOB_ID:
+            job.remove()
+
+def leader_heartbeat():
+    """Renew the scheduler leases and start or stop the notification jobs to match"""
+    gained, lost = set(), set()
+    
+    for index, lease in leases.items():
+        was_leader = lease.is_leader
+        # Shards owned by another process are only taken over once their lease has
+        # lapsed for a full TTL, giving their own process the first chance to return;
+        # a shard whose process never started is taken a TTL after it was first seen
+        preferred = home_shard is None or index == home_shard
+        
+        try:
+            is_leader = lease.try_acquire(
+                takeover_grace=0 if preferred else lease.ttl.total_seconds(),
+                create=preferred
+            )
+        except Exception as e:
+            logger.error(f"Error renewing scheduler lease {lease.name}: {e}")
+            lease.is_leader = is_leader = False
+        
+        if is_leader and not was_leader:
+            gained.add(index)
+        elif was_leader and not is_leader:
+            lost.add(index)
+    
+    if gained:
+        logger.info(f"Scheduler leases {sorted(gained)} acquired by {process_identity()}")
+    if lost:
+        logger.warning(f"Scheduler leases {sorted(lost)} lost by {process_identity()}")
+    
+    if not owned_shards():
+        if lost:
+            _stop_notification_jobs()
+    elif gained or lost:
+        # Rebuild for the new set of shards
+        if lost:
+            _stop_notification_jobs()
+        _start_notification_jobs()
+    elif get_scheduler_mode() == 'event':
+        reconcile_session_notification_jobs()
+        # No polling tick in event mode, so the heartbeat watches the backlog
+        check_reminder_backlog()
+
+def start_scheduler(shard_index=None):
+    """Start the background scheduler as a candidate for the scheduler leases
+    
+    With SCHEDULER_SHARDS > 1 each process should be given its own
+    ``shard_index``; it still takes over other shards whose owner died.
+    """
+    global scheduler, leases, home_shard
+    
+    if scheduler is not None:
+        return  # Already started
+    
+    try:
+        shard_count = get_shard_count()
+        if shard_count == 1:
+            leases = {0: LeaderLease('scheduler')}
+        else:
+            leases = {index: LeaderLease(f'scheduler-shard-{index}') for index in range(shard_count)}
+        home_shard = shard_index
+        
+        scheduler = BackgroundScheduler(timezone=timezone.get_current_timezone())
+        scheduler.start()
+        
+        # Only lease holders add the notification jobs; the others just keep trying
+        scheduler.add_job(
+            leader_heartbeat,
+            'interval',
+            seconds=leases[0].heartbeat_seconds,
+            id=HEARTBEAT_JOB_ID,
+            next_run_time=timezone.now(),
+            replace_existing=True
+        )
         
         logger.info("Background scheduler started successfully")
         
@@ -125,14 +688,25 @@ def start_scheduler():
         logger.error(f"Failed to start scheduler: {e}")
 
 def shutdown_scheduler():
-    """Shutdown the background scheduler"""
-    global scheduler
+    """Shutdown the background scheduler and hand the leases over"""
+    global scheduler, google_pool
     
     if scheduler:
         scheduler.shutdown()
         scheduler = None
         logger.info("Background scheduler shut down")
+    
+    if google_pool is not None:
+        google_pool.shutdown(wait=True)
+        google_pool = None
+    
+    for lease in leases.values():
+        if lease.is_leader:
+            try:
+                lease.release()
+            except Exception as e:
+                logger.error(f"Error releasing scheduler lease {lease.name}: {e}")
 
 def get_scheduler():
     """Get the global scheduler instance"""
-    return scheduler
\ No newline at end of file
+    return scheduler
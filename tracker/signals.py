@@ -0,0 +1,89 @@
+"""
+Keep UserCounters in step with the rows they count.
+
+post_save/post_delete also fire for queryset deletes and cascades, so the
+counters stay right whichever path removes a session. Every save also
+bumps the user's data_version, and notification changes wake the user's
+live notification streams. In event mode, session saves and deletes are
+also handed to the scheduler leader so it can re-plan the reminder job.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Notification, StudySession, UserCounters
+from .notification_events import notify_user
+from .scheduler import REMINDER_JOB_FIELDS, queue_reminder_job_change
+
+
+@receiver(post_save, sender=StudySession)
+def count_saved_session(sender, instance, created, update_fields=None, **kwargs):
+    previous_status = getattr(instance, '_loaded_status', None)
+    status_saved = created or update_fields is None or 'status' in update_fields
+    if status_saved:
+        instance._loaded_status = instance.status
+
+    if created:
+        deltas = UserCounters.session_deltas(added_status=instance.status)
+    elif previous_status is None and status_saved:
+        # Status was never loaded (deferred field), so the change is unknown
+        UserCounters.rebuild(instance.user_id)
+        return
+    elif status_saved and previous_status != instance.status:
+        deltas = UserCounters.session_deltas(added_status=instance.status, removed_status=previous_status)
+    else:
+        deltas = {}
+    # Applied even without counter changes: every save bumps data_version
+    UserCounters.apply_delta(instance.user_id, deltas)
+
+
+@receiver(post_delete, sender=StudySession)
+def count_deleted_session(sender, instance, **kwargs):
+    status = getattr(instance, '_loaded_status', None) or instance.status
+    # create=False: during a user cascade the counters row may already be gone
+    UserCounters.apply_delta(instance.user_id, UserCounters.session_deltas(removed_status=status), create=False)
+
+
+@receiver(post_save, sender=StudySession)
+def replan_saved_session_reminder(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or REMINDER_JOB_FIELDS & set(update_fields):
+        queue_reminder_job_change(instance.id, instance.user_id)
+
+
+@receiver(post_delete, sender=StudySession)
+def replan_deleted_session_reminder(sender, instance, **kwargs):
+    queue_reminder_job_change(instance.id, instance.user_id)
+
+
+@receiver(post_save, sender=Notification)
+def count_saved_notification(sender, instance, created, update_fields=None, **kwargs):
+    counted_saved = created or update_fields is None or {'is_read', 'notification_type'} & set(update_fields)
+
+    if created:
+        UserCounters.apply_delta(instance.user_id, UserCounters.notification_deltas(
+            instance.notification_type, instance.is_read
+        ))
+    elif not counted_saved:
+        UserCounters.apply_delta(instance.user_id, {})
+    elif getattr(instance, '_loaded_is_read', None) is None or getattr(instance, '_loaded_type', None) is None:
+        UserCounters.rebuild(instance.user_id)
+    else:
+        deltas = UserCounters.notification_deltas(instance._loaded_type, instance._loaded_is_read, sign=-1)
+        for field, delta in UserCounters.notification_deltas(instance.notification_type, instance.is_read).items():
+            deltas[field] = deltas.get(field, 0) + delta
+        UserCounters.apply_delta(instance.user_id, deltas)
+
+    if counted_saved:
+        instance._loaded_is_read = instance.is_read
+        instance._loaded_type = instance.notification_type
+    notify_user(instance.user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def count_deleted_notification(sender, instance, **kwargs):
+    is_read = getattr(instance, '_loaded_is_read', None)
+    UserCounters.apply_delta(instance.user_id, UserCounters.notification_deltas(
+        getattr(instance, '_loaded_type', None) or instance.notification_type,
+        instance.is_read if is_read is None else is_read,
+        sign=-1
+    ), create=False)
+    notify_user(instance.user_id)
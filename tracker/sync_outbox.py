@@ -0,0 +1,254 @@
+"""
+Transactional outbox for Google Calendar sync.
+
+Views record the Google Calendar side of a session change as a
+GoogleSyncOutbox row inside the same transaction as the change itself and
+return straight away. A separate worker (`manage.py run_sync_worker`)
+drains the table: entries for one session run strictly in order, failures
+are retried with exponential backoff and entries that keep failing are
+dead-lettered with status 'failed'. Finished entries are pruned by the
+worker after GOOGLE_SYNC_OUTBOX_RETENTION_DAYS.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from .leader import process_identity
+from .models import GoogleCalendarIntegration, GoogleSyncOutbox, Notification, StudySession, UserCounters
+
+logger = logging.getLogger(__name__)
+
+# Entries that are not finished yet and therefore block later entries for the same session
+OPEN_STATUSES = ('pending', 'processing')
+
+
+def _sync_enabled(user):
+    return GoogleCalendarIntegration.objects.filter(user=user, sync_enabled=True).exists()
+
+
+def enqueue_session_sync(session):
+    """Queue a sync of `session` to Google Calendar
+
+    Must be called inside the transaction that saved the session. Returns
+    False without queueing anything when Google Calendar is not connected.
+    """
+    if not _sync_enabled(session.user):
+        return False
+
+    GoogleSyncOutbox.objects.create(
+        user=session.user,
+        study_session=session,
+        session_key=session.pk,
+        operation='sync',
+    )
+    session.google_sync_status = 'pending'
+    StudySession.objects.filter(pk=session.pk).update(google_sync_status='pending')
+    UserCounters.touch([session.user_id])
+    return True
+
+
+def enqueue_event_delete(session):
+    """Queue removal of the Google Calendar event of a session about to be deleted"""
+    if not session.google_event_id or not _sync_enabled(session.user):
+        return False
+
+    GoogleSyncOutbox.objects.create(
+        user=session.user,
+        study_session=None,
+        session_key=session.pk,
+        operation='delete',
+        google_event_id=session.google_event_id,
+    )
+    return True
+
+
+def retry_delay(attempts):
+    """Exponential backoff before the next attempt of a failed entry"""
+    base = settings.GOOGLE_SYNC_OUTBOX_RETRY_SECONDS
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), settings.GOOGLE_SYNC_OUTBOX_MAX_RETRY_SECONDS))
+
+
+def claim_outbox_entries(limit):
+    """Claim up to `limit` ready entries for this worker
+
+    Only the oldest open entry of each session is eligible, so changes to
+    one session are applied in the order they were made. Entries left in
+    'processing' by a worker that died are picked up again once their lock
+    is older than GOOGLE_SYNC_OUTBOX_LOCK_SECONDS.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.GOOGLE_SYNC_OUTBOX_LOCK_SECONDS)
+
+    earlier_open = GoogleSyncOutbox.objects.filter(
+        session_key=OuterRef('session_key'),
+        id__lt=OuterRef('id'),
+        status__in=OPEN_STATUSES,
+    )
+    ready_ids = list(
+        GoogleSyncOutbox.objects
+        .filter(
+            Q(status='pending', available_at__lte=now) |
+            Q(status='processing', locked_at__lt=stale_before)
+        )
+        .filter(~Exists(earlier_open))
+        .order_by('id')
+        .values_list('id', flat=True)[:limit]
+    )
+    if not ready_ids:
+        return []
+
+    token = f"{process_identity()}:{uuid.uuid4().hex[:8]}"
+    # The status conditions are repeated so a concurrent worker's claim wins cleanly
+    GoogleSyncOutbox.objects.filter(id__in=ready_ids).filter(
+        Q(status='pending', available_at__lte=now) | Q(status='processing', locked_at__lt=stale_before)
+    ).update(status='processing', locked_by=token, locked_at=now)
+
+    return list(
+        GoogleSyncOutbox.objects
+        .filter(locked_by=token, status='processing')
+        .select_related('user', 'study_session')
+        .order_by('id')
+    )
+
+
+def _apply_entry(service, entry):
+    if entry.operation == 'delete':
+        return service.delete_event_by_id(entry.user, entry.google_event_id)
+
+    session = entry.study_session
+    if session is None:
+        # Session deleted after this entry was queued, nothing left to sync
+        return True, "Session no longer exists"
+
+    previous_event_id = session.google_event_id
+    result = service.sync_session(entry.user, session)
+    if StudySession.objects.filter(pk=session.pk).exists():
+        return result
+
+    # Deleted while we were syncing: its delete entry could not know about an
+    # event created just now, so queue that event's removal instead
+    entry.study_session_id = None
+    if session.google_event_id and session.google_event_id != previous_event_id:
+        GoogleSyncOutbox.objects.create(
+            user_id=entry.user_id,
+            study_session=None,
+            session_key=entry.session_key,
+            operation='delete',
+            google_event_id=session.google_event_id,
+        )
+        return True, "Session deleted during sync, its new event is queued for removal"
+    return True, "Session no longer exists"
+
+
+def _has_open_entries(entry):
+    return GoogleSyncOutbox.objects.filter(
+        session_key=entry.session_key,
+        id__gt=entry.id,
+        status__in=OPEN_STATUSES,
+    ).exists()
+
+
+def _mark_done(entry, message):
+    now = timezone.now()
+    GoogleSyncOutbox.objects.filter(pk=entry.pk).update(
+        status='done', processed_at=now, locked_by=None, locked_at=None, last_error=None
+    )
+    if entry.study_session_id and not _has_open_entries(entry):
+        StudySession.objects.filter(pk=entry.study_session_id).update(google_sync_status='done')
+        UserCounters.touch([entry.user_id])
+
+
+def _mark_failed(entry, message):
+    now = timezone.now()
+    attempts = entry.attempts + 1
+
+    if attempts < settings.GOOGLE_SYNC_OUTBOX_MAX_ATTEMPTS:
+        GoogleSyncOutbox.objects.filter(pk=entry.pk).update(
+            status='pending', attempts=attempts, available_at=now + retry_delay(attempts),
+            locked_by=None, locked_at=None, last_error=message
+        )
+        logger.warning(f"Google sync for session {entry.session_key} failed (attempt {attempts}): {message}")
+        return
+
+    # Out of retries: dead-letter the entry so later changes to the session can proceed
+    GoogleSyncOutbox.objects.filter(pk=entry.pk).update(
+        status='failed', attempts=attempts, processed_at=now,
+        locked_by=None, locked_at=None, last_error=message
+    )
+    logger.error(f"Google sync for session {entry.session_key} dead-lettered after {attempts} attempts: {message}")
+
+    if entry.study_session_id and not _has_open_entries(entry):
+        if not StudySession.objects.filter(pk=entry.study_session_id).update(google_sync_status='failed'):
+            return  # Session deleted meanwhile, nothing to report on
+        UserCounters.touch([entry.user_id])
+        Notification.objects.get_or_create(
+            user=entry.user,
+            study_session_id=entry.study_session_id,
+            notification_type='system',
+            title="Google Calendar Sync Failed",
+            defaults={
+                'message': f"Your study session could not be synced to Google Calendar: {message}",
+            }
+        )
+
+
+def process_outbox_batch(limit=None):
+    """Claim and apply one batch of outbox entries; returns (done, failed)"""
+    from .google_calendar_service import GoogleCalendarService
+
+    entries = claim_outbox_entries(limit or settings.GOOGLE_SYNC_OUTBOX_BATCH_SIZE)
+    service = GoogleCalendarService()
+    done_count = failed_count = 0
+
+    for entry in entries:
+        try:
+            success, message = _apply_entry(service, entry)
+        except Exception as e:
+            success, message = False, str(e)
+
+        with transaction.atomic():
+            if success:
+                _mark_done(entry, message)
+                done_count += 1
+            else:
+                _mark_failed(entry, message)
+                failed_count += 1
+
+    return done_count, failed_count
+
+
+def retry_failed_entries(user=None):
+    """Put dead-lettered entries back in the queue"""
+    entries = GoogleSyncOutbox.objects.filter(status='failed')
+    if user is not None:
+        entries = entries.filter(user=user)
+
+    with transaction.atomic():
+        retried = list(entries.exclude(study_session=None).values_list('study_session_id', 'user_id'))
+        count = entries.update(status='pending', attempts=0, available_at=timezone.now(), processed_at=None)
+        StudySession.objects.filter(pk__in=[session_id for session_id, _ in retried]).update(google_sync_status='pending')
+        UserCounters.touch(user_id for _, user_id in retried)
+    return count
+
+
+def prune_done_entries(batch_size=1000):
+    """Delete entries that finished more than GOOGLE_SYNC_OUTBOX_RETENTION_DAYS ago
+
+    Dead-lettered entries are kept for inspection and retry_failed_entries.
+    Deletes in batches so the table is never locked for long. Returns the
+    number of entries deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.GOOGLE_SYNC_OUTBOX_RETENTION_DAYS)
+    deleted = 0
+    while True:
+        ids = list(
+            GoogleSyncOutbox.objects.filter(status='done', processed_at__lt=cutoff)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += GoogleSyncOutbox.objects.filter(id__in=ids).delete()[0]
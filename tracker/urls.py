@@ -21,6 +21,7 @@ urlpatterns = [
     path('google-calendar/callback/', views.google_calendar_callback, name='google_calendar_callback'),
     path('google-calendar/disconnect/', views.google_calendar_disconnect, name='google_calendar_disconnect'),
     path('google-calendar/sync-all/', views.google_calendar_sync_all, name='google_calendar_sync_all'),
+    path('google-calendar/pull/', views.google_calendar_pull, name='google_calendar_pull'),
     path('sessions/<int:session_id>/toggle-sync/', views.toggle_session_sync, name='toggle_session_sync'),
     
     # Notification URLs
@@ -38,9 +39,13 @@ urlpatterns = [
     path('api/study-summary/', views.api_study_summary, name='api_study_summary'),
     path('api/session-durations/', views.api_session_durations, name='api_session_durations'),
     
+    # Metrics scrape endpoint
+    path('metrics/', views.metrics_view, name='metrics'),
+    
     # Notification API endpoints
     path('api/notifications/', views.api_notifications, name='api_notifications'),
     path('api/notifications/counts/', views.api_notification_counts, name='api_notification_counts'),
+    path('api/notifications/stream/', views.api_notification_stream, name='api_notification_stream'),
     path('api/notifications/<int:pk>/mark-read/', views.api_mark_notification_read, name='api_mark_notification_read'),
     path('api/notifications/mark-all-read/', views.api_mark_all_notifications_read, name='api_mark_all_notifications_read'),
     path('api/notifications/<int:pk>/delete/', views.api_delete_notification, name='api_delete_notification'),
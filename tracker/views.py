@@ -2,18 +2,28 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Max, Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .models import StudySession, GoogleCalendarIntegration, Notification
+from .models import StudySession, GoogleCalendarIntegration, Notification, UserCounters
 from .forms import StudySessionForm, UserRegistrationForm
-from .google_calendar_service import GoogleCalendarService
+from . import metrics
+from .sync_outbox import enqueue_event_delete, enqueue_session_sync
+from .conditional import conditional_on_data_version
+from .notification_events import counts_payload, notification_event_stream, notify_user, serialize_notification
+import base64
+import hashlib
 import secrets
 from datetime import datetime, timedelta
 
@@ -47,6 +57,33 @@ def create_achievement_notification(user, title, message, session=None):
     )
     return notification
 
+def encode_notification_cursor(notification):
+    """Opaque cursor for a position in the (created_at, id) notification order"""
+    raw = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_notification_cursor(cursor):
+    """(created_at, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, notification_id = raw.rsplit('|', 1)
+        created_at = datetime.fromisoformat(created_at)
+        notification_id = int(notification_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if timezone.is_naive(created_at):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return created_at, notification_id
+
+def parse_calendar_bound(value):
+    """Date of a FullCalendar range bound ('2025-06-01' or '2025-06-01T00:00:00+07:00'), or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace(' ', '+')).date()
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+
 # ===== VIEW FUNCTIONS =====
 
 def home(request):
@@ -68,30 +105,17 @@ def session_create(request):
     if request.method == 'POST':
         form = StudySessionForm(request.POST)
         if form.is_valid():
-            session = form.save(commit=False)
-            session.user = request.user
-            session.save()
+            with transaction.atomic():
+                session = form.save(commit=False)
+                session.user = request.user
+                session.save()
+                # Queued with the session; run_sync_worker pushes it to Google Calendar
+                queued = session.sync_to_google and enqueue_session_sync(session)
             
             messages.success(request, 'Study session created successfully!')
             
-            # Auto sync to Google Calendar if enabled
-            if session.sync_to_google:
-                try:
-                    integration = GoogleCalendarIntegration.objects.get(user=request.user, sync_enabled=True)
-                    service = GoogleCalendarService()
-                    success, message = service.sync_session(request.user, session)
-                    
-                    if success:
-                        create_system_notification(
-                            user=request.user,
-                            title="Google Calendar Sync",
-                            message=f"Your study session '{session.subject}' has been successfully synced to Google Calendar.",
-                            session=session
-                        )
-                    else:
-                        messages.warning(request, f'Sync to Google Calendar failed: {message}')
-                except GoogleCalendarIntegration.DoesNotExist:
-                    messages.warning(request, 'Google Calendar is not connected.')
+            if session.sync_to_google and not queued:
+                messages.warning(request, 'Google Calendar is not connected.')
                 
             return redirect('session_list')
     else:
@@ -108,7 +132,11 @@ def session_edit(request, pk):
     if request.method == 'POST':
         form = StudySessionForm(request.POST, instance=session)
         if form.is_valid():
-            updated_session = form.save()
+            with transaction.atomic():
+                updated_session = form.save()
+                # Check if sync status changed or session details changed
+                needs_sync = updated_session.sync_to_google != old_sync_status or updated_session.sync_to_google
+                queued = needs_sync and enqueue_session_sync(updated_session)
             
             # Check if session time/date was changed
             if old_date != updated_session.study_date or old_time != updated_session.start_time:
@@ -119,19 +147,10 @@ def session_edit(request, pk):
                     session=updated_session
                 )
             
-            # Check if sync status changed or session details changed
-            if updated_session.sync_to_google != old_sync_status or updated_session.sync_to_google:
-                try:
-                    integration = GoogleCalendarIntegration.objects.get(user=request.user, sync_enabled=True)
-                    service = GoogleCalendarService()
-                    success, message = service.sync_session(request.user, updated_session)
-                    
-                    if success:
-                        messages.success(request, 'Study session updated and synced to Google Calendar!')
-                    else:
-                        messages.warning(request, f'Study session updated but sync failed: {message}')
-                except GoogleCalendarIntegration.DoesNotExist:
-                    messages.warning(request, 'Study session updated but Google Calendar is not connected.')
+            if queued:
+                messages.success(request, 'Study session updated, Google Calendar sync is pending.')
+            elif needs_sync:
+                messages.warning(request, 'Study session updated but Google Calendar is not connected.')
             else:
                 messages.success(request, 'Study session updated successfully!')
                 
@@ -144,19 +163,12 @@ def session_edit(request, pk):
 def session_delete(request, pk):
     session = get_object_or_404(StudySession, pk=pk, user=request.user)
     if request.method == 'POST':
-        # If session is synced to Google Calendar, try to delete it there too
-        if session.sync_to_google and session.google_event_id:
-            try:
-                integration = GoogleCalendarIntegration.objects.get(user=request.user, sync_enabled=True)
-                service = GoogleCalendarService()
-                success, message = service.delete_calendar_event(request.user, session)
-                
-                if not success:
-                    messages.warning(request, f'Session deleted locally but failed to delete from Google Calendar: {message}')
-            except GoogleCalendarIntegration.DoesNotExist:
-                pass  # Just delete locally
-        
-        session.delete()
+        with transaction.atomic():
+            # Queue removing its Google Calendar event, if it still has one. Not gated
+            # on sync_to_google: sync may have just been turned off with the event's
+            # removal still queued, and that entry finds the session gone
+            enqueue_event_delete(session)
+            session.delete()
         messages.success(request, 'Study session deleted successfully!')
         return redirect('session_list')
     return render(request, 'tracker/session_confirm_delete.html', {'session': session})
@@ -207,6 +219,7 @@ def google_calendar_settings(request):
 
 @login_required
 def google_calendar_connect(request):
+    from .google_calendar_service import GoogleCalendarService
     service = GoogleCalendarService()
     state = secrets.token_urlsafe(32)
     request.session['google_oauth_state'] = state
@@ -215,6 +228,7 @@ def google_calendar_connect(request):
 
 @login_required
 def google_calendar_callback(request):
+    from .google_calendar_service import GoogleCalendarService
     code = request.GET.get('code')
     state = request.GET.get('state')
     stored_state = request.session.get('google_oauth_state')
@@ -239,9 +253,11 @@ def google_calendar_callback(request):
 
 @login_required
 def google_calendar_disconnect(request):
+    from .google_calendar_service import forget_user_credentials
     try:
         integration = GoogleCalendarIntegration.objects.get(user=request.user)
         integration.delete()
+        forget_user_credentials(request.user.id)
         messages.success(request, 'Google Calendar disconnected successfully!')
     except GoogleCalendarIntegration.DoesNotExist:
         messages.warning(request, 'No Google Calendar integration found.')
@@ -249,6 +265,7 @@ def google_calendar_disconnect(request):
 
 @login_required
 def google_calendar_sync_all(request):
+    from .google_calendar_service import GoogleCalendarService
     try:
         # Check if user has Google Calendar integration
         integration = GoogleCalendarIntegration.objects.get(user=request.user, sync_enabled=True)
@@ -263,16 +280,11 @@ def google_calendar_sync_all(request):
             messages.info(request, 'No sessions found with Google Calendar sync enabled.')
             return redirect('google_calendar_settings')
         service = GoogleCalendarService()
-        success_count = 0
-        error_count = 0
         
-        for session in sessions_to_sync:
-            success, message = service.sync_session(request.user, session)
-            if success:
-                success_count += 1
-            else:
-                error_count += 1
-                print(f"Sync error for session {session.id}: {message}")  # Log error
+        # Pack all sessions into Calendar batch requests instead of one round trip each
+        success_count, error_count, errors = service.bulk_sync_sessions(request.user, list(sessions_to_sync))
+        for error in errors:
+            print(f"Sync error: {error}")  # Log error
         
         if success_count > 0 and error_count == 0:
             messages.success(request, f'Successfully synced {success_count} session(s) to Google Calendar!')
@@ -288,45 +300,78 @@ def google_calendar_sync_all(request):
     
     return redirect('google_calendar_settings')
 
+@login_required
+def google_calendar_pull(request):
+    """Pull changes made in Google Calendar back into the user's sessions"""
+    from .google_calendar_service import GoogleCalendarService
+    service = GoogleCalendarService()
+    success, message = service.pull_calendar_changes(request.user)
+    
+    if success:
+        messages.success(request, message)
+    else:
+        messages.error(request, message)
+    
+    return redirect('google_calendar_settings')
+
 @login_required
 def toggle_session_sync(request, session_id):
     session = get_object_or_404(StudySession, id=session_id, user=request.user)
-    session.sync_to_google = not session.sync_to_google
-    session.save()
-      # If sync was just enabled, try to sync to Google Calendar immediately
+    with transaction.atomic():
+        session.sync_to_google = not session.sync_to_google
+        session.save()
+        # Enabling creates the event, disabling removes it; both happen in the sync worker
+        queued = enqueue_session_sync(session)
+    
     if session.sync_to_google:
-        try:
-            integration = GoogleCalendarIntegration.objects.get(user=request.user, sync_enabled=True)
-            service = GoogleCalendarService()
-            success, message = service.sync_session(request.user, session)
-            
-            status = "enabled and synced" if success else f"enabled but sync failed: {message}"
-        except GoogleCalendarIntegration.DoesNotExist:
-            status = "enabled but Google Calendar not connected"
+        status = "enabled, sync pending" if queued else "enabled but Google Calendar not connected"
     else:
         status = "disabled"
     
-    return JsonResponse({'success': True, 'status': status})
+    return JsonResponse({'success': True, 'status': status, 'sync_status': session.google_sync_status})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def api_overview(request):
-    sessions_count = StudySession.objects.filter(user=request.user).count()
-    completed_count = StudySession.objects.filter(user=request.user, status='Completed').count()
+    counters = UserCounters.for_user(request.user.id)
     
     return Response({
-        'total_sessions': sessions_count,
-        'completed_sessions': completed_count,
+        'total_sessions': counters.total_sessions,
+        'completed_sessions': counters.completed_sessions,
         'user': request.user.username
     })
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def api_calendar_events(request):
+    """Sessions in the range FullCalendar is showing (`start`/`end`), with ETag revalidation"""
     sessions = StudySession.objects.filter(user=request.user)
+    
+    try:
+        start = parse_calendar_bound(request.GET.get('start'))
+        end = parse_calendar_bound(request.GET.get('end'))
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if start:
+        sessions = sessions.filter(study_date__gte=start)
+    if end:
+        sessions = sessions.filter(study_date__lte=end)
+    
+    # Count catches deletions, the newest updated_at catches every edit and addition
+    state = sessions.aggregate(count=Count('id'), latest=Max('updated_at'))
+    etag = quote_etag(hashlib.md5(
+        f"{request.user.id}:{start}:{end}:{state['count']}:{state['latest']}".encode()
+    ).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    
     events = []
     
-    for session in sessions:
+    for session in sessions.only('id', 'subject', 'study_date', 'start_time', 'end_time', 'description', 'status'):
         events.append({
             'id': session.id,
             'title': f'{session.subject}',
@@ -336,10 +381,13 @@ def api_calendar_events(request):
             'status': session.status
         })
     
-    return Response(events)
+    response = Response(events)
+    response['ETag'] = etag
+    return response
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version()
 def api_calendar(request):
     sessions = StudySession.objects.filter(user=request.user)
     data = []
@@ -358,21 +406,21 @@ def api_calendar(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version()
 def api_study_summary(request):
-    total_sessions = StudySession.objects.filter(user=request.user).count()
-    completed_sessions = StudySession.objects.filter(user=request.user, status='Completed').count()
-    planned_sessions = StudySession.objects.filter(user=request.user, status='Planned').count()
-    missed_sessions = StudySession.objects.filter(user=request.user, status='Missed').count()
+    # Materialized per-user counters: one primary-key lookup however many sessions exist
+    counters = UserCounters.for_user(request.user.id)
     
     return Response({
-        'total': total_sessions,
-        'completed': completed_sessions,
-        'planned': planned_sessions,
-        'missed': missed_sessions
+        'total': counters.total_sessions,
+        'completed': counters.completed_sessions,
+        'planned': counters.planned_sessions,
+        'missed': counters.missed_sessions
     })
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version()
 def api_session_durations(request):
     sessions = StudySession.objects.filter(user=request.user).order_by('-study_date')[:10]  # Last 10 sessions
     data = []
@@ -398,6 +446,13 @@ def api_session_durations(request):
     
     return Response(data)
 
+def metrics_view(request):
+    """Expose this process's metrics in the Prometheus text format"""
+    remote_addr = request.META.get('REMOTE_ADDR')
+    if not (request.user.is_staff or remote_addr in settings.METRICS_ALLOWED_IPS):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 # ===== NOTIFICATION VIEWS =====
 
 @login_required
@@ -425,7 +480,7 @@ def notification_list(request):
     page_obj = paginator.get_page(page_number)
     
     # Count unread notifications
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_count = UserCounters.for_user(request.user.id).unread_notifications
     
     context = {
         'page_obj': page_obj,
@@ -463,7 +518,11 @@ def notification_mark_read(request, pk):
 @login_required
 def notification_mark_all_read(request):
     """Mark all user's notifications as read"""
-    updated_count = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    with transaction.atomic():
+        updated_count = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        # update() bypasses the counter signals
+        UserCounters.apply_delta(request.user.id, {'unread_notifications': -updated_count})
+        notify_user(request.user.id)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({
@@ -535,9 +594,15 @@ def create_session_reminder(request, session_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version()
 def api_notifications(request):
-    """Get user's notifications with pagination and filtering"""
-    notifications = Notification.objects.filter(user=request.user)
+    """Get user's notifications, newest first, one page at a time
+    
+    Pages are keyset-paginated on (created_at, id): pass the X-Next-Cursor
+    response header back as `cursor` for the next (older) page, or the
+    X-Latest-Cursor header as `since` to fetch only newer notifications.
+    """
+    notifications = Notification.objects.filter(user=request.user).select_related('study_session')
     
     # Filter by type
     notification_type = request.GET.get('type')
@@ -549,48 +614,65 @@ def api_notifications(request):
     if is_read is not None:
         notifications = notifications.filter(is_read=is_read.lower() == 'true')
     
-    # Limit results
-    limit = int(request.GET.get('limit', 20))
-    notifications = notifications[:limit]
-    
-    data = []
-    for notification in notifications:
-        data.append({
-            'id': notification.id,
-            'title': notification.title,
-            'message': notification.message,
-            'notification_type': notification.notification_type,
-            'is_read': notification.is_read,
-            'created_at': notification.created_at.isoformat(),
-            'study_session': {
-                'id': notification.study_session.id,
-                'subject': notification.study_session.subject,
-                'study_date': notification.study_session.study_date.isoformat(),
-            } if notification.study_session else None
-        })
-    
-    return Response(data)
+    try:
+        limit = request.GET.get('limit', str(settings.NOTIFICATIONS_PAGE_SIZE))
+        if not limit.isdigit():
+            raise ValueError(f"Invalid limit: {limit}")
+        limit = int(limit)
+        if request.GET.get('cursor'):
+            created_at, notification_id = decode_notification_cursor(request.GET['cursor'])
+            notifications = notifications.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
+            )
+        if request.GET.get('since'):
+            created_at, notification_id = decode_notification_cursor(request.GET['since'])
+            notifications = notifications.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=notification_id)
+            )
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Fetch one extra row to know whether another page exists
+    limit = max(1, min(limit, settings.NOTIFICATIONS_PAGE_SIZE_MAX))
+    page = list(notifications.order_by('-created_at', '-id')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    
+    response = Response([serialize_notification(notification) for notification in page])
+    if page:
+        response['X-Latest-Cursor'] = encode_notification_cursor(page[0])
+    if has_more:
+        response['X-Next-Cursor'] = encode_notification_cursor(page[-1])
+    return response
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def api_notification_counts(request):
     """Get notification counts by type and status"""
-    total_count = Notification.objects.filter(user=request.user).count()
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
-    
-    counts_by_type = {}
-    for choice in Notification._meta.get_field('notification_type').choices:
-        type_key = choice[0]
-        counts_by_type[type_key] = Notification.objects.filter(
-            user=request.user, 
-            notification_type=type_key
-        ).count()
-    
-    return Response({
-        'total': total_count,
-        'unread': unread_count,
-        'by_type': counts_by_type
-    })
+    # Polling fallback for pages without a live stream, so read the per-user counters row
+    return Response(counts_payload(UserCounters.for_user(request.user.id)))
+
+async def api_notification_stream(request):
+    """Stream notification counts and new notifications as Server-Sent Events"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI each stream would hold a worker thread; 204 tells EventSource to stop
+        # so the page falls back to polling
+        return HttpResponse(status=204)
+    
+    last_event_id = request.headers.get('Last-Event-ID')
+    response = StreamingHttpResponse(
+        notification_event_stream(user.id, int(last_event_id) if last_event_id and last_event_id.isdigit() else None),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -615,10 +697,14 @@ def api_mark_notification_read(request, pk):
 @permission_classes([IsAuthenticated])
 def api_mark_all_notifications_read(request):
     """Mark all user's notifications as read via API"""
-    updated_count = Notification.objects.filter(
-        user=request.user, 
-        is_read=False
-    ).update(is_read=True)
+    with transaction.atomic():
+        updated_count = Notification.objects.filter(
+            user=request.user, 
+            is_read=False
+        ).update(is_read=True)
+        # update() bypasses the counter signals
+        UserCounters.apply_delta(request.user.id, {'unread_notifications': -updated_count})
+        notify_user(request.user.id)
     
     return Response({
         'success': True,
@@ -697,7 +783,7 @@ def api_create_session_reminder(request):
 
 def check_and_create_session_achievements(user, session):
     """Check for achievements and create notifications"""
-    completed_sessions = StudySession.objects.filter(user=user, status='Completed').count()
+    completed_sessions = UserCounters.for_user(user.id).completed_sessions
     
     # Achievement milestones
     milestones = [1, 5, 10, 25, 50, 100]
@@ -756,6 +842,7 @@ def api_mark_session_completed(request, session_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_data_version(vary_seconds=60)
 def api_upcoming_sessions(request):
     """Get upcoming sessions for notification purposes"""
     from django.utils import timezone
@@ -0,0 +1,67 @@
+"""
+Bounded thread pool for slow external side-effects (e.g. Google Calendar).
+
+Work is queued up to a fixed limit. When the queue is full, submit() waits
+briefly for a free slot and then refuses the task (returns False), so
+callers are never blocked for long by a slow external API and can persist
+the work somewhere else instead.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedWorkerPool:
+    """Run tasks on a fixed number of threads with a bounded backlog"""
+    
+    def __init__(self, name, max_workers=4, max_queue=100):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        # One slot per running or queued task
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+    
+    def submit(self, fn, *args, timeout=0):
+        """Queue a task; return False if no slot frees up within timeout seconds"""
+        acquired = self._slots.acquire(timeout=timeout) if timeout else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            logger.warning(f"{self.name} pool is full, refusing {getattr(fn, '__name__', fn)}")
+            return False
+        
+        with self._lock:
+            self.pending += 1
+        try:
+            self._executor.submit(self._run, fn, args)
+        except RuntimeError:
+            # The pool was shut down
+            self._release()
+            return False
+        return True
+    
+    def _run(self, fn, args):
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.error(f"Error in {self.name} task {getattr(fn, '__name__', fn)}: {e}")
+        finally:
+            # Worker threads keep their own database connections
+            close_old_connections()
+            self._release()
+    
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+    
+    def shutdown(self, wait=True):
+        """Stop accepting tasks and optionally wait for queued ones to finish"""
+        self._executor.shutdown(wait=wait)